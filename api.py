@@ -1,11 +1,44 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from pathlib import Path
+
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse
+
+from config import app_settings
+from src.agent import (
+    get_aula_client,
+    get_response,
+    model_router,
+    response_cache,
+    warm_up,
+)
+from src.digest import family_digest
+from src.media import MediaCache, MediaDownloader
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def _warm_up():
+    try:
+        await asyncio.to_thread(warm_up)
+    except Exception as e:
+        _LOGGER.warning(f"Warm-up failed, continuing lazily: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so the worker is ready immediately
+    task = asyncio.create_task(_warm_up())
+    yield
+    task.cancel()
 
-from src.agent import get_response
 
 # Set up FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 # Allow CORS for all origins
 app.add_middleware(
     CORSMiddleware,
@@ -36,11 +69,90 @@ async def root():
 @app.get("/chat")
 async def chat(query: str, model: str = "gpt-4o", agent: str = "research_agent"):
     """
-    Chat endpoint
+    Chat endpoint. Use model="auto" to let the router pick the model
     """
     return await get_response(query, model, agent)
 
 
+@app.get("/digest")
+async def digest(days: int = 1, message_limit: int = 5):
+    """
+    Presence, calendar, messages and albums for all children in one response
+    """
+    return await asyncio.to_thread(
+        family_digest, get_aula_client(), days=days, message_limit=message_limit
+    )
+
+
+@app.get("/stats/cache")
+async def cache_stats():
+    """
+    Response cache hit ratio and model time saved
+    """
+    return response_cache.stats()
+
+
+@app.get("/stats/models")
+async def model_stats():
+    """
+    Latency percentiles and error rates per model, and recent routing decisions
+    """
+    return model_router.stats()
+
+
+@app.get("/stats/upstream")
+async def upstream_stats():
+    """
+    Rate limiter state for upstream Aula calls: queue depth, throttling and retries
+    """
+    return get_aula_client().limiter.stats()
+
+
+@lru_cache
+def get_media() -> MediaDownloader:
+    return MediaDownloader(
+        get_aula_client(),
+        MediaCache(
+            Path(app_settings().AULA_DATA_DIR) / "media",
+            max_bytes=app_settings().AULA_MEDIA_CACHE_MB * 1024 * 1024,
+        ),
+    )
+
+
+@app.get("/gallery")
+async def gallery():
+    """
+    List the gallery albums
+    """
+    albums = await asyncio.to_thread(get_aula_client().fetch_albums)
+    return [{"id": album["id"], "title": album.get("title")} for album in albums]
+
+
+@app.post("/gallery/{album_id}/download")
+async def download_album(album_id: str):
+    """
+    Download (or resume downloading) every picture of an album into the media cache
+    """
+    return await asyncio.to_thread(get_media().download_album, album_id)
+
+
+@app.get("/gallery/{album_id}/{picture_id}")
+async def picture(album_id: str, picture_id: str):
+    """
+    Serve a picture from the media cache, downloading it first if needed
+    """
+    media = get_media()
+    key = f"picture:{picture_id}"
+    path = media.cache.get(key)
+    if path is None:
+        pictures = await asyncio.to_thread(get_aula_client().fetch_album, album_id)
+        url = next((p["url"] for p in pictures if str(p["id"]) == picture_id), None)
+        if url is None:
+            raise HTTPException(status_code=404, detail="Picture not found")
+        path = await asyncio.to_thread(media.download, url, key)
+    return FileResponse(path)
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -9,7 +9,7 @@ from dash.dependencies import Input, Output, State
 from flask import Flask
 from starlette.middleware.wsgi import WSGIMiddleware
 
-from config import AVAILABLE_AGENTS, AVAILABLE_MODELS, app_settings
+from config import AUTO_MODEL, AVAILABLE_AGENTS, AVAILABLE_MODELS, app_settings
 
 
 def send_query(text: str, llm: str, agent: str) -> str:
@@ -57,7 +57,7 @@ app.layout = dmc.MantineProvider(
                                                 value=AVAILABLE_MODELS[0],
                                                 placeholder="Select model",
                                                 id="llm-select",
-                                                data=AVAILABLE_MODELS,
+                                                data=[*AVAILABLE_MODELS, AUTO_MODEL],
                                             ),
                                         ],
                                         gap=1,
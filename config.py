@@ -1,6 +1,5 @@
 from functools import lru_cache
 
-from inspari.config import load_dotenv
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings
 
@@ -12,9 +11,16 @@ AVAILABLE_MODELS: list[str] = [
     "anthropic:claude-3-5-haiku-latest",
 ]
 
+# Pseudo model letting the router pick a model per query
+AUTO_MODEL: str = "auto"
+
 
 AVAILABLE_AGENTS: list[str] = ["research_agent", "aula_agent"]
 
+# Agents whose answers may be cached. aula_agent answers from personal data and
+# must never be served from the cache.
+CACHEABLE_AGENTS: list[str] = ["research_agent"]
+
 
 class AppSettings(BaseSettings):
     # Azure OpenAI
@@ -29,11 +35,21 @@ class AppSettings(BaseSettings):
 
     AULA_USER: str | None = None
     AULA_PWD: SecretStr | None = None
+    # Local storage for synced Aula data (search index, calendar store, media)
+    AULA_DATA_DIR: str = "data"
+    AULA_MEDIA_CACHE_MB: int = 1024
+    # Store shared by the API workers for Aula sessions and cached responses:
+    # sqlite:///path, redis://host:port/db (needs the redis package) or memory://.
+    # Defaults to a SQLite file in AULA_DATA_DIR.
+    AULA_SHARED_STORE: str | None = None
 
     BACKEND_URL: str
 
 
 @lru_cache()
 def app_settings() -> AppSettings:
+    # Deferred: resolving key vault references pulls in the Azure SDK
+    from inspari.config import load_dotenv
+
     load_dotenv(dotenv_path=".env")
     return AppSettings()  # ignore
@@ -0,0 +1,52 @@
+"""Benchmark how long a fresh API worker takes to import the app.
+
+Each run imports `api` in a new interpreter, which is what every uvicorn worker
+does on start, and reports the time until the FastAPI app object exists:
+
+    uv run python scripts/bench_startup.py --runs 5
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_SNIPPET = """
+import time
+start = time.perf_counter()
+import api
+elapsed = time.perf_counter() - start
+import sys
+heavy = [m for m in ("pydantic_ai", "openai", "bs4", "lxml", "aiohttp") if m in sys.modules]
+print(elapsed, ",".join(heavy))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    timings = []
+    heavy = ""
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _SNIPPET],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        timings.append(float(output[0]))
+        heavy = output[1] if len(output) > 1 else ""
+
+    print(f"import api: median {statistics.median(timings) * 1000:.0f} ms, ", end="")
+    print(f"max {max(timings) * 1000:.0f} ms over {args.runs} runs")
+    print(f"heavy modules loaded at import: {heavy or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
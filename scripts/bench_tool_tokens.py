@@ -0,0 +1,183 @@
+"""Benchmark the prompt tokens produced per Aula tool call, raw vs. compact.
+
+Uses synthetic, Aula-shaped payloads so it runs without credentials:
+
+    uv run python scripts/bench_tool_tokens.py
+"""
+
+import datetime
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.aula_tools import AulaTools  # noqa: E402
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken if installed, otherwise estimate 4 chars/token."""
+    try:
+        import tiktoken
+
+        return len(tiktoken.get_encoding("o200k_base").encode(text))
+    except ImportError:
+        return len(text) // 4
+
+
+def _event(i: int) -> dict:
+    day = datetime.date.today() + datetime.timedelta(days=i // 6)
+    hour = 7 + i % 6
+    return {
+        "id": 1000 + i,
+        "title": f"Matematik {i}",
+        "type": "lesson",
+        "allDay": False,
+        "startDateTime": f"{day}T{hour:02d}:00:00+00:00",
+        "endDateTime": f"{day}T{hour:02d}:45:00+00:00",
+        "belongsToProfiles": [1, 2],
+        "belongsToResources": [],
+        "institutionCode": "123456",
+        "institutionName": "Eksempel Skole",
+        "creatorInstProfileId": 4242,
+        "creatorProfileId": 4243,
+        "creatorName": "Lærer Larsen",
+        "primaryResource": {"id": 55, "name": "Lokale 12", "shortName": "L12"},
+        "additionalResources": [],
+        "hasAttachments": False,
+        "repeating": None,
+        "responseRequired": False,
+        "lesson": {
+            "lessonId": f"L{i}",
+            "lessonStatus": "normal",
+            "participants": [
+                {
+                    "teacherId": 77,
+                    "teacherName": "Lærer Larsen",
+                    "teacherInitials": "LL",
+                    "participantRole": "primaryTeacher",
+                }
+            ],
+            "hasRelevantNote": False,
+        },
+        "invitees": [],
+        "directlyRelated": [],
+    }
+
+
+def _message(i: int) -> dict:
+    return {
+        "messageType": "Message",
+        "sender": {"fullName": "Lærer Larsen", "mailBoxOwner": {"id": 77}},
+        "sendDateTime": f"2025-03-1{i % 9}T08:15:00+01:00",
+        "text": {
+            "html": (
+                '<div style="font-family: Arial"><p>Kære forældre,</p>'
+                "<p>Vi tager på <b>tur til skoven</b> på fredag. Husk madpakke, "
+                "drikkedunk og tøj efter vejret.</p>"
+                '<p><span style="color: #333">Venlig hilsen<br/>Lærer Larsen</span></p>'
+                "</div>"
+            )
+        },
+    }
+
+
+class _StubSession:
+    """Serve Aula-shaped responses for the benchmark without any network."""
+
+    cookies = type("Cookies", (), {"get_dict": lambda self: {"Csrfp-Token": "x"}})()
+
+    def _response(self, payload):
+        attrs = {"json": lambda self: payload, "status_code": 200, "ok": True}
+        return type("Response", (), attrs)()
+
+    def request(self, method, url, **kwargs):
+        return self.get(url) if method == "GET" else self.post(url)
+
+    def get(self, url, **kwargs):
+        if "getThreads" in url:
+            threads = [{"id": i, "subject": f"Tur {i}"} for i in range(10)]
+            return self._response({"data": {"threads": threads}})
+        if "getMessagesForThread" in url:
+            data = {"messages": [_message(i) for i in range(4)]}
+            return self._response({"status": {"code": 0}, "data": data})
+        if "getDailyOverview" in url:
+            data = [
+                {
+                    "status": 3,
+                    "checkInTime": "07:45:00",
+                    "checkOutTime": None,
+                    "entryTime": "07:40:00",
+                    "exitTime": "15:00:00",
+                    "exitWith": "Mor",
+                    "comment": "",
+                    "location": None,
+                    "institutionProfile": {"id": 1, "name": "Barn Et"},
+                }
+            ]
+            return self._response({"status": {"message": "OK"}, "data": data})
+        return self._response({"status": {"message": "OK"}, "data": {}})
+
+    def post(self, url, **kwargs):
+        events = [_event(i) for i in range(30)]
+        return self._response({"status": {"message": "OK"}, "data": events})
+
+
+def _stub_client():
+    """Build an AulaClient backed by _StubSession."""
+    from src.aula_client import AulaClient
+
+    client = AulaClient("bench", "bench")
+    client._session = _StubSession()
+    client.ensure_session = lambda: None
+    children = [
+        {
+            "id": 1,
+            "name": "Barn Et",
+            "institutionProfile": {"institutionName": "Eksempel Skole"},
+        },
+        {
+            "id": 2,
+            "name": "Barn To",
+            "institutionProfile": {"institutionName": "Eksempel Skole"},
+        },
+    ]
+    client._profiles = [{"children": children}]
+    client.ids = {"Barn": 1}
+    client.set_active_child("Barn")
+    return client
+
+
+def _dumps(value) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def main():
+    client = _stub_client()
+    tools = AulaTools(client)
+    cases = {
+        "fetch_basic_data": (client.fetch_basic_data, tools.fetch_basic_data),
+        "fetch_daily_overview": (
+            client.fetch_daily_overview,
+            tools.fetch_daily_overview,
+        ),
+        "fetch_messages": (
+            client.fetch_messages,
+            lambda: tools.fetch_messages(limit=10),
+        ),
+        "fetch_calendar": (
+            lambda: client.fetch_calendar(days=14),
+            lambda: tools.fetch_calendar(days=14),
+        ),
+    }
+    print(f"{'tool':<22}{'before':>10}{'after':>10}{'saved':>8}")
+    for name, (before, after) in cases.items():
+        n_before = count_tokens(_dumps(before()))
+        n_after = count_tokens(_dumps(after()))
+        print(f"{name:<22}{n_before:>10}{n_after:>10}{1 - n_after / n_before:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+#!/bin/bash
+# This script syncs Aula data into the local archive, e.g. from cron.
+uv run python -m src.archive sync "$@"
@@ -1,24 +1,95 @@
 from __future__ import annotations as _annotations
 
+import time
 from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING
 
 from pydantic import BaseModel, Field
-from pydantic_ai import Agent, Tool
-from pydantic_ai.exceptions import ModelHTTPError, UserError
-from pydantic_ai.models.openai import OpenAIModel
-from pydantic_ai.providers.openai import OpenAIProvider
 
-from config import AVAILABLE_AGENTS, AVAILABLE_MODELS, app_settings
-from src.aula_client import AulaClient
-from src.llm import get_async_openai_client
-from src.research_tool import (
-    ResearchDeps,
-    fetch_url,
-    get_search,
+from config import (
+    AUTO_MODEL,
+    AVAILABLE_AGENTS,
+    AVAILABLE_MODELS,
+    CACHEABLE_AGENTS,
+    app_settings,
 )
+from src.archive import Archive
+from src.aula_client import AulaClient
+from src.aula_tools import AulaTools
+from src.calendar_store import CalendarStore
+from src.message_index import MessageIndex
+from src.response_cache import ResponseCache
+from src.routing import ModelRouter
+from src.shared_store import open_store
+
+if TYPE_CHECKING:
+    from pydantic_ai import Agent
+
+response_cache = ResponseCache()
+model_router = ModelRouter(AVAILABLE_MODELS)
+
+
+@lru_cache
+def get_aula_client() -> AulaClient:
+    """Return the shared Aula client, created on first use.
+
+    The client only logs in on its first request, so this is cheap to call. Its
+    login session and cached responses are shared with the other workers.
+    """
+    return create_aula_client()
+
+
+def create_aula_client(**kwargs) -> AulaClient:
+    """Create a new Aula client for the configured account.
+
+    Args:
+        **kwargs: Passed on to AulaClient, e.g. cache_responses=False
+    """
+    settings = app_settings()
+    store_url = (
+        settings.AULA_SHARED_STORE
+        or f"sqlite:///{Path(settings.AULA_DATA_DIR) / 'shared.db'}"
+    )
+    return AulaClient(
+        settings.AULA_USER,
+        settings.AULA_PWD.get_secret_value(),
+        store=open_store(store_url),
+        **kwargs,
+    )
+
+
+@lru_cache
+def get_aula_tools() -> AulaTools:
+    """Return the Aula agent tools with their local stores, created on first use."""
+    data_dir = Path(app_settings().AULA_DATA_DIR)
+    archive_path = data_dir / "archive.db"
+    return AulaTools(
+        get_aula_client(),
+        index=MessageIndex(data_dir / "messages.db"),
+        calendar=CalendarStore(data_dir / "calendar.db"),
+        # Only created by `python -m src.archive sync`, not on first use
+        archive=Archive(archive_path) if archive_path.exists() else None,
+    )
+
 
-current_time = datetime.now().isoformat()
-aula = AulaClient(app_settings().AULA_USER, app_settings().AULA_PWD.get_secret_value())
+def warm_up() -> None:
+    """Import the agent framework, log in to Aula and sync the message index.
+
+    Older message threads are then backfilled into the index, which can take
+    minutes the first time, so searches never have to walk the whole mailbox.
+
+    Meant to run in a background thread after startup, so workers accept
+    requests immediately and the first chat does not pay for the warm-up.
+    """
+    import pydantic_ai  # noqa: F401
+
+    if app_settings().AULA_USER and app_settings().AULA_PWD:
+        tools = get_aula_tools()
+        get_aula_client().ensure_session()
+        tools.index.sync(tools.client)
+        tools.index.backfill(tools.client)
 
 
 class ResearchResult(BaseModel):
@@ -39,18 +110,31 @@ def create_agent(model: str, agent: str) -> Agent:
     Args:
         model_name (str): The name of the model to use.
     """
+    from pydantic_ai import Agent, Tool
+    from pydantic_ai.exceptions import ModelHTTPError, UserError
+
+    # Per call, so the prompt date matches the response cache's date bucket
+    current_time = datetime.now().isoformat()
 
     if model not in AVAILABLE_MODELS:
         raise ValueError(f"Model {model} not in {AVAILABLE_MODELS}")
     if agent not in AVAILABLE_AGENTS:
         raise ValueError(f"Agent {agent} not in {AVAILABLE_AGENTS}")
     if not model.startswith("anthropic"):
+        # Only import the OpenAI provider when an OpenAI model is requested
+        from pydantic_ai.models.openai import OpenAIModel
+        from pydantic_ai.providers.openai import OpenAIProvider
+
+        from src.llm import get_async_openai_client
+
         try:
             client = get_async_openai_client()
             model = OpenAIModel(model, provider=OpenAIProvider(openai_client=client))
         except Exception as e:
             raise ValueError(f"Error creating model {model}: {e}")
     if agent == "research_agent":
+        from src.research_tool import fetch_url, get_search
+
         system_prompt = f"""current_time: {current_time}
 You're a helpful research assistant, you are an expert in research 
         If you are given a question you write strong keywords to do 3-5 searches in total 
@@ -70,36 +154,58 @@ You're a helpful research assistant, you are an expert in research
             ),
         ]
     elif agent == "aula_agent":
+        aula_tools = get_aula_tools()
         system_prompt = f"""current_time: {current_time}
 You're a helpful research assistant. You're an expert in navigating the danish school communication system, Aula.
 Only use the tools if the user is talking about the school, institution or about their kids.
-Make sure to set the active child before using any of the tools (except for fetch_basic_data).
+Make sure to set the active child before using any of the tools (except for fetch_basic_data and fetch_family_digest).
+For questions about all the children at once, use fetch_family_digest instead of looping over each child.
 """
         tools = [
             Tool(
                 name="set_active_child",
                 description="Set which child profile we’re operating on. Expects a single string argument: the child's name.",
-                function=aula.set_active_child,
+                function=aula_tools.set_active_child,
             ),
             Tool(
                 name="fetch_basic_data",
-                description="Return some basic info on all children’s {name: institution}.",
-                function=aula.fetch_basic_data,
+                description="Return some basic info on all children: id, name and institution.",
+                function=aula_tools.fetch_basic_data,
             ),
             Tool(
                 name="fetch_daily_overview",
-                description="Return today’s presence overview for the active child. Requires active child to be set.",
-                function=aula.fetch_daily_overview,
+                description="Return today’s presence overview for the active child. Optionally select fields. Requires active child to be set.",
+                function=aula_tools.fetch_daily_overview,
             ),
             Tool(
                 name="fetch_messages",
-                description="Fetch the latest unread message for the active child. Requires active child to be set.",
-                function=aula.fetch_messages,
+                description="Fetch the latest message threads as plain text, newest first. Use limit to fetch fewer threads. Requires active child to be set.",
+                function=aula_tools.fetch_messages,
             ),
             Tool(
                 name="fetch_calendar",
-                description="Fetch upcoming calendar events for the next N days. Expects an integer argument. Requires active child to be set.",
-                function=aula.fetch_calendar,
+                description="Fetch upcoming calendar events for the next N days grouped by date. Optionally limit events and select fields. Requires active child to be set.",
+                function=aula_tools.fetch_calendar,
+            ),
+            Tool(
+                name="fetch_calendar_period",
+                description="Fetch calendar events for a period such as 'today', 'tomorrow', 'this week', 'next tuesday' or '2025-03-17..2025-03-21', grouped by date. Requires active child to be set.",
+                function=aula_tools.fetch_calendar_period,
+            ),
+            Tool(
+                name="search_messages",
+                description="Search all Aula messages for keywords and return the best matching snippets. Optionally filter by child name and a since date (YYYY-MM-DD). Prefer this over fetch_messages for questions about specific topics.",
+                function=aula_tools.search_messages,
+            ),
+            Tool(
+                name="fetch_family_digest",
+                description="Return today's presence and calendar for all children plus the latest messages and gallery albums in a single call. Does not require an active child.",
+                function=aula_tools.fetch_family_digest,
+            ),
+            Tool(
+                name="query_archive",
+                description="Look up historical calendar events, messages, presence or gallery metadata in the local archive by child and date range (YYYY-MM-DD). Use for questions about past months or school years. Does not require an active child.",
+                function=aula_tools.query_archive,
             ),
         ]
     try:
@@ -117,12 +223,20 @@ Make sure to set the active child before using any of the tools (except for fetc
 
 
 async def get_response(query: str, model: str, agent: str) -> str:
-    from datetime import date
+    from src.research_tool import ResearchDeps
+
+    current = datetime.now().date().isoformat()
 
-    current = date.today().isoformat()
+    cache_key = None
+    if agent in CACHEABLE_AGENTS:
+        cache_key = response_cache.key(query, model, agent, current)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    if model != AUTO_MODEL and model not in AVAILABLE_MODELS:
+        raise ValueError(f"Model {model} not in {AVAILABLE_MODELS}")
+    started = time.perf_counter()
 
-    # pick your model at runtime:
-    agent = create_agent(model, agent)
     # prepare your deps
     deps = ResearchDeps(
         max_results=3,
@@ -131,6 +245,13 @@ async def get_response(query: str, model: str, agent: str) -> str:
         search_api_cx=app_settings().GOOGLE_SEARCH_cx.get_secret_value(),
     )
 
-    # run!
-    result = await agent.run(query, deps=deps)
-    return result.output
+    async def run_on(model_name: str) -> str:
+        # pick your model at runtime:
+        result = await create_agent(model_name, agent).run(query, deps=deps)
+        return result.output
+
+    # run! The router falls back to another model if this one fails or times out
+    output = await model_router.route(query, agent, model, run_on)
+    if cache_key is not None:
+        response_cache.put(cache_key, output, time.perf_counter() - started)
+    return output
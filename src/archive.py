@@ -0,0 +1,416 @@
+"""Append-only local archive of Aula data, with an incremental sync CLI.
+
+Messages, calendar events, presence and gallery metadata for all children are
+stored in SQLite, partitioned by child and date. Stored payloads never change:
+a changed record is appended as a new version, so the archive keeps history.
+Checkpoints make syncs incremental, and data is written window by window or
+page by page, so years of history never have to fit in memory.
+
+    uv run python -m src.archive sync --since 2023-08-01
+    uv run python -m src.archive stats
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from src.aula_client import AulaClient
+from src.aula_models import CalendarEvent, local_today, parse_aula_datetime
+from src.html_utils import html_to_text
+
+_LOGGER = logging.getLogger(__name__)
+
+KINDS = ("calendar", "messages", "presence", "gallery")
+# Records that concern the whole account rather than a single child
+ACCOUNT = "*"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    kind TEXT NOT NULL,
+    child TEXT NOT NULL,
+    day TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    version TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    payload TEXT NOT NULL,
+    seq INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, child, record_id, version)
+);
+CREATE INDEX IF NOT EXISTS records_partition ON records (child, day, kind);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    kind TEXT PRIMARY KEY,
+    cursor TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class Archive:
+    """SQLite archive of Aula records, partitioned by child and day."""
+
+    def __init__(self, path: str | Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(records)")]
+        if "seq" not in columns:
+            # Archives created before versions were sequenced
+            with self._conn:
+                self._conn.execute(
+                    "ALTER TABLE records ADD COLUMN seq INTEGER NOT NULL DEFAULT 0"
+                )
+                self._conn.execute("UPDATE records SET seq = rowid")
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def append(self, kind: str, rows: list[tuple[str, str, str, dict]]) -> int:
+        """Append (child, day, record_id, payload) rows, skipping known versions.
+
+        Every row gets the next sequence number, and the highest one marks the
+        latest version of a record. When an older version comes back (A, B, A),
+        it is not stored again; instead its sequence number is moved past the
+        current latest, so it becomes the latest again.
+
+        Returns:
+            Number of new rows
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            # Take the write lock before reading the sequence, for other processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            (seq,) = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM records"
+            ).fetchone()
+            values = []
+            for child, day, record_id, payload in rows:
+                data = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+                version = hashlib.sha1(data.encode()).hexdigest()[:12]
+                seq += 1
+                values.append(
+                    (kind, child, day, str(record_id), version, now, data, seq)
+                )
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)", values
+            )
+            added = self._conn.total_changes - before
+            self._conn.executemany(
+                "UPDATE records SET seq = :seq, synced_at = :now WHERE kind = :kind "
+                "AND child = :child AND record_id = :record_id AND version = :version "
+                "AND seq < (SELECT MAX(seq) FROM records l WHERE l.kind = :kind "
+                "AND l.child = :child AND l.record_id = :record_id)",
+                [
+                    dict(
+                        kind=kind,
+                        child=child,
+                        record_id=record_id,
+                        version=version,
+                        now=now,
+                        seq=seq,
+                    )
+                    for kind, child, _, record_id, version, _, _, seq in values
+                ],
+            )
+            return added
+
+    def checkpoint(self, kind: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cursor FROM checkpoints WHERE kind = ?", (kind,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_checkpoint(self, kind: str, cursor: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?)",
+                (kind, cursor, time.time()),
+            )
+
+    def query(
+        self,
+        kind: str,
+        child: str | None = None,
+        start: str | None = None,
+        end: str | None = None,
+        limit: int = 50,
+    ) -> list[dict]:
+        """Return the latest version of matching records, oldest day first.
+
+        Args:
+            kind: One of KINDS
+            child: Child first name; account wide records are always included
+            start: First day to include (YYYY-MM-DD)
+            end: Last day to include (YYYY-MM-DD)
+            limit: Maximum number of records
+        """
+        sql = (
+            "SELECT child, day, payload FROM records r WHERE kind = ? "
+            "AND seq = (SELECT MAX(seq) FROM records l WHERE "
+            "l.kind = r.kind AND l.child = r.child AND l.record_id = r.record_id)"
+        )
+        params: list = [kind]
+        if child:
+            sql += " AND child IN (?, ?)"
+            params += [child, ACCOUNT]
+        if start:
+            sql += " AND day >= ?"
+            params.append(start)
+        if end:
+            sql += " AND day <= ?"
+            params.append(end)
+        sql += " ORDER BY day, record_id LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"child": child, "day": day, **json.loads(payload)}
+            for child, day, payload in rows
+        ]
+
+    def stats(self) -> dict:
+        """Return record counts per kind and child, and the checkpoints."""
+        with self._lock:
+            counts = self._conn.execute(
+                "SELECT kind, child, COUNT(*), MIN(day), MAX(day) FROM records "
+                "GROUP BY kind, child ORDER BY kind, child"
+            ).fetchall()
+            checkpoints = dict(
+                self._conn.execute("SELECT kind, cursor FROM checkpoints").fetchall()
+            )
+        return {
+            "records": [
+                {"kind": k, "child": c, "count": n, "first": first, "last": last}
+                for k, c, n, first, last in counts
+            ],
+            "checkpoints": checkpoints,
+        }
+
+
+class ArchiveSync:
+    """Incrementally copy Aula data for all children into an Archive."""
+
+    def __init__(
+        self,
+        client: AulaClient,
+        archive: Archive,
+        window_days: int = 30,
+        days_ahead: int = 60,
+        max_pages: int = 1000,
+    ):
+        """Create a sync job.
+
+        Args:
+            client: Client for the account
+            archive: Archive to append to
+            window_days: Days of calendar fetched per request
+            days_ahead: Days of future calendar to include
+            max_pages: Maximum number of pages walked, both of the thread list
+                and of the messages in each thread
+        """
+        self.client = client
+        self.archive = archive
+        self.window_days = window_days
+        self.days_ahead = days_ahead
+        self.max_pages = max_pages
+
+    def run(
+        self, since: datetime.date, kinds: tuple[str, ...] = KINDS
+    ) -> dict[str, int | str]:
+        """Sync the given kinds concurrently.
+
+        Args:
+            since: Earliest day to sync when there is no checkpoint yet
+            kinds: Which data to sync
+
+        Returns:
+            Number of new records per kind, or the error that stopped it
+        """
+        # Log in once before the concurrent jobs share the session
+        self.client.ensure_session()
+        jobs = {kind: getattr(self, f"sync_{kind}") for kind in kinds}
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = {kind: pool.submit(job, since) for kind, job in jobs.items()}
+        results = {}
+        for kind, future in futures.items():
+            try:
+                results[kind] = future.result()
+            except Exception as e:
+                _LOGGER.error(f"Syncing {kind} failed: {e}")
+                results[kind] = f"failed: {e}"
+        return results
+
+    def _child_names(self) -> dict[int, str]:
+        return {child_id: name for name, child_id in self.client.ids.items()}
+
+    def sync_calendar(self, since: datetime.date) -> int:
+        """Sync calendar events window by window.
+
+        The checkpoint only moves up to today, since past events no longer change.
+        Future windows are synced again on every run.
+        """
+        today = local_today()
+        checkpoint = self.archive.checkpoint("calendar")
+        start = datetime.date.fromisoformat(checkpoint) if checkpoint else since
+        end = today + datetime.timedelta(days=self.days_ahead)
+        names = self._child_names()
+        added = 0
+        while start < end:
+            window_end = min(end, start + datetime.timedelta(days=self.window_days))
+            events = self.client.fetch_calendar_range(start, window_end)
+            if events is None:
+                raise RuntimeError(f"Calendar request failed for {start}")
+            rows = []
+            for event in events:
+                day = CalendarEvent.from_aula(event).date
+                for child_id in event.get("belongsToProfiles", []):
+                    if child_id in names:
+                        rows.append((names[child_id], day, event.get("id"), event))
+            added += self.archive.append("calendar", rows)
+            self.archive.set_checkpoint("calendar", min(window_end, today).isoformat())
+            start = window_end
+        return added
+
+    def sync_messages(self, since: datetime.date) -> int:
+        """Sync message threads page by page, newest first, down to the checkpoint."""
+        checkpoint = self.archive.checkpoint("messages") or since.isoformat()
+        newest = checkpoint
+        added = 0
+        for page in range(self.max_pages):
+            threads = self.client.fetch_threads(page=page)
+            if not threads:
+                break
+            # Threads without a date cannot be compared and are always synced
+            changed = [
+                t
+                for t in threads
+                if not _thread_latest(t) or _thread_latest(t) > checkpoint
+            ]
+            for thread in changed:
+                added += self._sync_thread(thread)
+                newest = max(newest, _thread_latest(thread))
+            if len(changed) < len(threads):
+                # Threads are ordered by latest activity, the rest is synced already
+                break
+        self.archive.set_checkpoint("messages", newest)
+        return added
+
+    def _sync_thread(self, thread: dict) -> int:
+        """Archive every page of a thread's messages, one page at a time."""
+        children = [
+            child.get("displayName", child.get("name", "")).split(" ")[0]
+            for child in thread.get("regardingChildren") or []
+        ] or [ACCOUNT]
+        added = 0
+        seen: set[str] = set()
+        for page in range(self.max_pages):
+            response = self.client.fetch_thread_messages(
+                thread["id"], page=page, cached=False
+            )
+            if response["status"]["code"] == 403:
+                break
+            data = response.get("data") or {}
+            rows = []
+            new_ids = False
+            for msg in data.get("messages") or []:
+                sent = msg.get("sendDateTime")
+                record_id = str(msg.get("id") or f"{thread['id']}:{sent}")
+                new_ids |= record_id not in seen
+                seen.add(record_id)
+                if msg.get("messageType") != "Message":
+                    continue
+                text = msg.get("text")
+                payload = {
+                    "thread_id": thread["id"],
+                    "subject": thread.get("subject"),
+                    "sender": (msg.get("sender") or {}).get("fullName"),
+                    "sent": sent,
+                    "text": html_to_text(
+                        text.get("html") if isinstance(text, dict) else text
+                    ),
+                }
+                day = parse_aula_datetime(sent).date().isoformat() if sent else ""
+                rows += [(child, day, record_id, payload) for child in children]
+            added += self.archive.append("messages", rows)
+            # An empty or repeated page means the oldest message has been reached
+            if not new_ids or data.get("moreMessagesExist") is False:
+                break
+        return added
+
+    def sync_presence(self, since: datetime.date) -> int:
+        """Snapshot today's presence; Aula has no presence history to backfill."""
+        today = local_today().isoformat()
+        names = self._child_names()
+        rows = [
+            (names[child_id], today, today, overview)
+            for child_id, overview in self.client.fetch_presence().items()
+            if child_id in names
+        ]
+        return self.archive.append("presence", rows)
+
+    def sync_gallery(self, since: datetime.date) -> int:
+        """Sync album and picture metadata (not the pictures themselves)."""
+        added = 0
+        for album in self.client.fetch_albums():
+            day = (album.get("creationDate") or album.get("created") or "")[:10]
+            if day and day < since.isoformat():
+                continue
+            rows = [(ACCOUNT, day, f"album:{album['id']}", album)]
+            rows += [
+                (ACCOUNT, day, f"picture:{p['id']}", p)
+                for p in self.client.fetch_album(album["id"])
+            ]
+            added += self.archive.append("gallery", rows)
+        return added
+
+
+def _thread_latest(thread: dict) -> str:
+    """Return when a thread last changed, comparable as a string."""
+    latest = thread.get("latestMessage") or {}
+    return latest.get("sendDateTime") or thread.get("lastUpdatedDate") or ""
+
+
+def main(argv: list[str] | None = None) -> None:
+    from config import app_settings
+    from src.agent import create_aula_client
+
+    parser = argparse.ArgumentParser(description="Sync Aula data to a local archive")
+    parser.add_argument(
+        "--archive",
+        help="SQLite archive file, default archive.db in AULA_DATA_DIR",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    sync = commands.add_parser("sync", help="Fetch new data into the archive")
+    sync.add_argument(
+        "--since",
+        type=datetime.date.fromisoformat,
+        default=local_today() - datetime.timedelta(days=365),
+        help="Earliest day for the first sync (YYYY-MM-DD), default one year back",
+    )
+    sync.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    commands.add_parser("stats", help="Show what the archive contains")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    archive = Archive(args.archive or Path(app_settings().AULA_DATA_DIR) / "archive.db")
+    if args.command == "sync":
+        # Each response is read once, so do not fill the shared response cache
+        client = create_aula_client(cache_responses=False)
+        result = ArchiveSync(client, archive).run(args.since, tuple(args.kinds))
+    else:
+        result = archive.stats()
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
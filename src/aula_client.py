@@ -1,51 +1,150 @@
 import datetime
 import functools
+import hashlib
 import json
 import logging
+import threading
+import time
 from collections import defaultdict
 
 import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
+from src.aula_models import AULA_TIMEZONE, local_today
+from src.html_utils import extract_form
+from src.rate_limit import RateLimiter, default_limiter
+from src.shared_store import SharedStore
+
 load_dotenv()
 _LOGGER = logging.getLogger(__name__)
 
 
+def _local_midnight(day: datetime.date) -> str:
+    """Format local midnight at the start of a date the way Aula expects it."""
+    midnight = datetime.datetime.combine(day, datetime.time(), AULA_TIMEZONE)
+    return midnight.strftime("%Y-%m-%d %H:%M:%S.0000%z")
+
+
 class AulaClient:
     """Aula client for connecting and fetching specific data."""
 
-    def __init__(self, username: str, password: str):
-        """Initialize the Aula client with username and password."""
+    # Seconds a shared login session is kept, and between session checks
+    SESSION_TTL = 3600
+    SESSION_CHECK_INTERVAL = 60
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        limiter: RateLimiter | None = None,
+        store: SharedStore | None = None,
+        cache_responses: bool = True,
+    ):
+        """Initialize the Aula client with username and password.
+
+        Args:
+            username: UniLogin username
+            password: UniLogin password
+            limiter: Rate limiter for all upstream calls, shared per process by default
+            store: Optional store shared between workers for the login session
+                and cached API responses
+            cache_responses: Share API responses through the store. Disable for
+                bulk jobs that read each response only once.
+        """
         self._username = username
         self._password = password
         self._session = None
+        self.limiter = limiter or default_limiter
+        self.store = store
+        self.cache_responses = cache_responses
         self.apiurl = "https://www.aula.dk/api/v20"
         self._profiles = None
+        self._session_blob = None
+        self._checked_at = 0.0
+        # Serializes session checks and logins between threads using this client
+        self._session_lock = threading.Lock()
+        self.login_timings: list[tuple[str, float]] = []
         self.active_child = None
+        user_hash = hashlib.sha256(str(username).encode()).hexdigest()[:16]
+        self._store_prefix = f"aula:{user_hash}"
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request with the session through the rate limiter.
+
+        Call ensure_session() first for Aula URLs that require a login.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            **kwargs: Passed on to requests.Session.request
+        """
+        return self.limiter.request(
+            self._session, method, url, account=self._username, **kwargs
+        )
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Send a GET request, see request()."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Send a POST request, see request()."""
+        return self.request("POST", url, **kwargs)
+
+    @property
+    def profiles(self) -> list:
+        """The profiles of the logged in user, with their children."""
+        self.ensure_session()
+        return self._profiles or []
+
+    def _cached_json(self, method: str, url: str, ttl: float, **kwargs) -> dict:
+        """Request JSON, sharing OK responses with other workers for ttl seconds."""
+        key = None
+        if self.store is not None and self.cache_responses:
+            body = kwargs.get("data") or json.dumps(kwargs.get("json"))
+            digest = hashlib.sha256(f"{method} {url} {body}".encode()).hexdigest()
+            key = f"{self._store_prefix}:response:{digest}"
+            cached = self.store.get(key)
+            if cached is not None:
+                return json.loads(cached)
+        response = self.request(method, url, **kwargs).json()
+        if key and response.get("status", {}).get("message") == "OK":
+            self.store.set(key, json.dumps(response).encode(), ttl)
+        return response
 
     def _login(self) -> bool:
-        """Authenticate with Aula and establish a session."""
+        """Authenticate with Aula and establish a session.
+
+        The duration of every step is kept in self.login_timings.
+        """
         _LOGGER.debug("Attempting to log in to Aula")
         self._session = requests.Session()
+        self.login_timings = []
+        started = step_started = time.perf_counter()
+
+        def step(name: str) -> None:
+            nonlocal step_started
+            now = time.perf_counter()
+            self.login_timings.append((name, now - step_started))
+            step_started = now
 
         headers = {
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/112.0",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
         }
         params = {"type": "unilogin"}
-        response = self._session.get(
+        response = self.get(
             "https://login.aula.dk/auth/login.php",
             params=params,
             headers=headers,
             verify=True,
         )
+        step("login page")
 
-        html = BeautifulSoup(response.text, "lxml")
-        url = html.form["action"]
+        url, _ = extract_form(response.text)
         headers["Content-Type"] = "application/x-www-form-urlencoded"
         data = {"selectedIdp": "uni_idp"}
-        response = self._session.post(url, headers=headers, data=data, verify=True)
+        response = self.post(url, headers=headers, data=data, verify=True)
+        step("select idp")
 
         user_data = {
             "username": self._username,
@@ -55,13 +154,7 @@ class AulaClient:
         redirects = 0
         success = False
         while not success and redirects < 10:
-            html = BeautifulSoup(response.text, "lxml")
-            url = html.form["action"]
-            post_data = {
-                input["name"]: input["value"]
-                for input in html.find_all("input")
-                if input.has_attr("name") and input.has_attr("value")
-            }
+            url, post_data = extract_form(response.text)
             post_data.update(
                 {
                     key: user_data[key]
@@ -69,7 +162,8 @@ class AulaClient:
                     if key in post_data or key not in post_data
                 }
             )
-            response = self._session.post(url, data=post_data, verify=True)
+            response = self.post(url, data=post_data, verify=True)
+            step(f"form {redirects + 1}")
             if response.url == "https://www.aula.dk:443/portal/":
                 success = True
             redirects += 1
@@ -83,9 +177,10 @@ class AulaClient:
         while not api_success:
             self.apiurl = f"https://www.aula.dk/api/v{apiver}"
             _LOGGER.debug(f"Trying API at {self.apiurl}")
-            response = self._session.get(
+            response = self.get(
                 self.apiurl + "?method=profiles.getProfilesByLogin", verify=True
             )
+            step(f"api v{apiver}")
             if response.status_code == 410:
                 apiver += 1
             elif response.status_code == 403:
@@ -99,23 +194,116 @@ class AulaClient:
                 raise Exception("API connection failed")
 
         _LOGGER.debug("Login successful. API found at " + self.apiurl)
+        _LOGGER.debug(
+            f"Login took {time.perf_counter() - started:.2f}s: "
+            + ", ".join(
+                f"{name} {seconds:.2f}s" for name, seconds in self.login_timings
+            )
+        )
+        self._set_profiles(self._profiles)
+        self._save_session()
+        return True
+
+    def _set_profiles(self, profiles: list) -> None:
+        self._profiles = profiles
         self.ids = {
             c.get("name").split(" ")[0]: c.get("id")
             for c in self._profiles[0].get("children")
         }
+
+    def _save_session(self) -> None:
+        """Publish the logged in session to the other workers."""
+        self._checked_at = time.monotonic()
+        if self.store is None:
+            return
+        self._session_blob = json.dumps(
+            {
+                "apiurl": self.apiurl,
+                "profiles": self._profiles,
+                "cookies": [
+                    {
+                        "name": c.name,
+                        "value": c.value,
+                        "domain": c.domain,
+                        "path": c.path,
+                    }
+                    for c in self._session.cookies
+                ],
+            }
+        ).encode()
+        self.store.set(
+            f"{self._store_prefix}:session", self._session_blob, self.SESSION_TTL
+        )
+
+    def _restore_session(self) -> bool:
+        """Adopt a session another worker has logged in, if there is one."""
+        if self.store is None:
+            return False
+        blob = self.store.get(f"{self._store_prefix}:session")
+        if blob is None or blob == self._session_blob:
+            return False
+        data = json.loads(blob)
+        session = requests.Session()
+        for cookie in data["cookies"]:
+            session.cookies.set(**cookie)
+        self._session = session
+        self._session_blob = blob
+        self.apiurl = data["apiurl"]
+        self._set_profiles(data["profiles"])
+        _LOGGER.debug("Restored shared Aula session")
         return True
 
-    def _ensure_session(self):
-        """Ensure the session is active, re-authenticate if necessary."""
-        if not self._session:
+    def _login_shared(self) -> None:
+        """Log in, letting only one worker at a time log in to the account."""
+        if self.store is None:
             self._login()
-        response = self._session.get(
-            self.apiurl + "?method=profiles.getProfilesByLogin", verify=True
-        ).json()
-        if response["status"]["message"] != "OK":
-            _LOGGER.debug("Session expired, re-authenticating")
+            return
+        lock = f"{self._store_prefix}:login-lock"
+        if self.store.add(lock, b"1", ttl=60):
+            try:
+                self._login()
+            finally:
+                self.store.delete(lock)
+            return
+        _LOGGER.debug("Another worker is logging in, waiting for its session")
+        deadline = time.monotonic() + 60
+        while self.store.get(lock) is not None and time.monotonic() < deadline:
+            time.sleep(0.5)
+        if not self._restore_session():
             self._login()
 
+    def ensure_session(self):
+        """Ensure the session is active, re-authenticate if necessary.
+
+        Safe to call from several threads: one thread checks the session and
+        logs in, the others wait and then reuse its session.
+        """
+        if self._session_is_fresh():
+            return
+        with self._session_lock:
+            # Another thread may have checked or logged in while we waited
+            if self._session_is_fresh():
+                return
+            if not self._session:
+                if not self._restore_session():
+                    self._login_shared()
+                if self._session_is_fresh():
+                    return
+            response = self.get(
+                self.apiurl + "?method=profiles.getProfilesByLogin", verify=True
+            ).json()
+            if response["status"]["message"] != "OK":
+                _LOGGER.debug("Session expired, re-authenticating")
+                if not self._restore_session():
+                    self._login_shared()
+            self._checked_at = time.monotonic()
+
+    def _session_is_fresh(self) -> bool:
+        return (
+            self._session is not None
+            and time.monotonic() - self._checked_at < self.SESSION_CHECK_INTERVAL
+        )
+
     def require_active_child(func):
         @functools.wraps(func)
         def wrapper(self, *args, **kwargs):
@@ -134,13 +322,13 @@ class AulaClient:
     @require_active_child
     def get_child_id(self) -> int:
         """Get the child ID for the active child."""
-        self._ensure_session()
+        self.ensure_session()
         return self.ids.get(self.active_child)
 
     @require_active_child
     def get_institution(self) -> str:
         """Get the institution name for the active child."""
-        self._ensure_session()
+        self.ensure_session()
         return [
             c["institutionProfile"]["institutionName"]
             for c in self._profiles[0].get("children")
@@ -149,7 +337,7 @@ class AulaClient:
 
     def fetch_basic_data(self) -> str:
         """Fetch basic profile data from Aula."""
-        self._ensure_session()
+        self.ensure_session()
         children_data = {}
         if not self._profiles:
             _LOGGER.debug("No profiles found")
@@ -167,13 +355,15 @@ class AulaClient:
     @require_active_child
     def fetch_daily_overview(self) -> dict:
         """Fetch daily overview (presence data) for the active child."""
-        self._ensure_session()
+        self.ensure_session()
         overview = {}
-        response = self._session.get(
+        response = self._cached_json(
+            "GET",
             self.apiurl
             + f"?method=presence.getDailyOverview&childIds[]={self.get_child_id()}",
+            ttl=60,
             verify=True,
-        ).json()
+        )
         if response["data"]:
             overview[self.get_child_id()] = response["data"][0]
         else:
@@ -183,22 +373,72 @@ class AulaClient:
         _LOGGER.debug(f"Daily overview: {overview}")
         return overview
 
-    def fetch_messages(self) -> list:
-        """Fetch the latest messages."""
-        self._ensure_session()
-        response = self._session.get(
+    def fetch_presence(self) -> dict[int, dict]:
+        """Fetch today's presence for all children in a single call.
+
+        Returns:
+            Mapping from child id to its Aula daily overview
+        """
+        self.ensure_session()
+        query = "&".join(f"childIds[]={child_id}" for child_id in self.ids.values())
+        response = self._cached_json(
+            "GET",
+            self.apiurl + f"?method=presence.getDailyOverview&{query}",
+            ttl=60,
+            verify=True,
+        )
+        overviews = {}
+        for position, item in enumerate(response.get("data") or []):
+            child_id = (item.get("institutionProfile") or {}).get("id")
+            if child_id is None and position < len(self.ids):
+                child_id = list(self.ids.values())[position]
+            overviews[child_id] = item
+        return overviews
+
+    def fetch_threads(self, page: int = 0) -> list:
+        """Fetch one page of message threads, newest first.
+
+        Args:
+            page: Page number, starting at 0
+        """
+        self.ensure_session()
+        response = self._cached_json(
+            "GET",
             self.apiurl
-            + "?method=messaging.getThreads&sortOn=date&orderDirection=desc&page=0",
+            + f"?method=messaging.getThreads&sortOn=date&orderDirection=desc&page={page}",
+            ttl=60,
             verify=True,
-        ).json()
-        print(response)
+        )
+        return response["data"]["threads"]
+
+    def fetch_thread_messages(
+        self, thread_id: int | str, page: int = 0, cached: bool = True
+    ) -> dict:
+        """Fetch the raw response with one page of messages for a single thread.
+
+        Args:
+            thread_id: Id of the thread
+            page: Page of messages to fetch, newest first
+            cached: Allow a response cached by another worker. Pass False when
+                the thread is known to have changed, e.g. when syncing it.
+        """
+        url = (
+            self.apiurl
+            + f"?method=messaging.getMessagesForThread&threadId={thread_id}&page={page}"
+        )
+        if not cached:
+            return self.get(url, verify=True).json()
+        return self._cached_json("GET", url, ttl=300, verify=True)
+
+    def fetch_messages(self, limit: int | None = None) -> dict:
+        """Fetch the latest messages.
+
+        Args:
+            limit: Maximum number of threads to fetch, newest first
+        """
         messages = {}
-        for thread in response["data"]["threads"]:
-            thread_response = self._session.get(
-                self.apiurl
-                + f"?method=messaging.getMessagesForThread&threadId={thread['id']}&page=0",
-                verify=True,
-            ).json()
+        for thread in self.fetch_threads()[:limit]:
+            thread_response = self.fetch_thread_messages(thread["id"])
 
             if thread_response["status"]["code"] == 403:
                 messages[thread["id"]] = {
@@ -227,47 +467,63 @@ class AulaClient:
         _LOGGER.debug(f"Latest messages: {messages}")
         return messages
 
-    def fetch_calendar(self, days: int = 14, structured: bool = True) -> list:
-        """Fetch calendar events for the next specified number of days.
+    def fetch_calendar_range(
+        self, start: datetime.date, end: datetime.date
+    ) -> list | None:
+        """Fetch raw calendar events for all children in a date range.
 
         Args:
-            days: Number of days to fetch calendar events for
-            structured: If True, returns events organized by day instead of a flat list
+            start: First day to include
+            end: Day after the last day to include
+
+        Returns:
+            List of Aula events, or None if Aula did not answer OK
         """
-        self._ensure_session()
+        self.ensure_session()
         csrf_token = self._session.cookies.get_dict()["Csrfp-Token"]
         headers = {"csrfp-token": csrf_token, "content-type": "application/json"}
 
-        start = datetime.datetime.now(datetime.timezone.utc).strftime(
-            "%Y-%m-%d 00:00:00.0000%z"
-        )
-        end = (
-            datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=days)
-        ).strftime("%Y-%m-%d 00:00:00.0000%z")
         post_data = json.dumps(
             {
                 "instProfileIds": list(self.ids.values()),
                 "resourceIds": [],
-                "start": start,
-                "end": end,
+                "start": _local_midnight(start),
+                "end": _local_midnight(end),
             }
         )
 
-        response = self._session.post(
+        response = self._cached_json(
+            "POST",
             self.apiurl + "?method=calendar.getEventsByProfileIdsAndResourceIds",
+            ttl=300,
             data=post_data,
             headers=headers,
+            # Read-only lookup, safe to retry although it is a POST
+            idempotent=True,
             verify=True,
-        ).json()
+        )
 
         if response["status"]["message"] != "OK":
             _LOGGER.warning(f"Failed to fetch calendar: {response}")
+            return None
+        return response["data"]
+
+    def fetch_calendar(self, days: int = 14, structured: bool = True) -> list:
+        """Fetch calendar events for the next specified number of days.
+
+        Args:
+            days: Number of days to fetch calendar events for
+            structured: If True, returns events organized by day instead of a flat list
+        """
+        today = local_today()
+        response = self.fetch_calendar_range(
+            today, today + datetime.timedelta(days=days)
+        )
+        if response is None:
             return []
 
         events = [
-            res
-            for res in response["data"]
-            if self.get_child_id() in res["belongsToProfiles"]
+            res for res in response if self.get_child_id() in res["belongsToProfiles"]
         ]
         _LOGGER.debug(f"Calendar events: {events}")
 
@@ -294,9 +550,9 @@ class AulaClient:
             date_str = start_datetime.strftime("%Y-%m-%d")
 
             # Add formatted time to the event for display purposes
-            event[
-                "formatted_time"
-            ] = f"{start_datetime.strftime('%H:%M')} - {datetime.datetime.fromisoformat(event['endDateTime'].replace('Z', '+00:00')).strftime('%H:%M')}"
+            event["formatted_time"] = (
+                f"{start_datetime.strftime('%H:%M')} - {datetime.datetime.fromisoformat(event['endDateTime'].replace('Z', '+00:00')).strftime('%H:%M')}"
+            )
 
             # Add event to the corresponding day
             daily_events[date_str].append(event)
@@ -307,9 +563,9 @@ class AulaClient:
 
         return dict(daily_events)
 
-    def fetch_gallery(self) -> list:
-        """Fetch gallery items (images and posts) from Aula."""
-        self._ensure_session()
+    def fetch_albums(self) -> list:
+        """Fetch the gallery albums visible for all children."""
+        self.ensure_session()
         child_ids = [
             str(child["id"])
             for profile in self._profiles
@@ -317,45 +573,65 @@ class AulaClient:
         ]
         inst_profile_ids = ",".join(child_ids)
 
-        response = self._session.get(
+        response = self._cached_json(
+            "GET",
             self.apiurl
             + f"?method=gallery.getAlbums&institutionProfileIds={inst_profile_ids}&page=0",
+            ttl=300,
             verify=True,
-        ).json()
+        )
 
         if response["status"]["message"] != "OK":
             _LOGGER.warning(f"Failed to fetch gallery: {response}")
             return []
+        return response["data"]["albums"]
+
+    def fetch_album(self, album_id: int | str) -> list:
+        """Fetch the pictures of a single album.
 
+        Returns:
+            List of {"id", "title", "url", "created", "album"} dicts
+        """
+        self.ensure_session()
+        album_response = self._cached_json(
+            "GET",
+            self.apiurl + f"?method=gallery.getAlbum&id={album_id}",
+            ttl=600,
+            verify=True,
+        )
+        if album_response["status"]["message"] != "OK":
+            _LOGGER.warning(f"Failed to fetch album {album_id}: {album_response}")
+            return []
+        return [
+            {
+                "id": item.get("id"),
+                "title": item.get("title", ""),
+                "url": item.get("url", ""),
+                "created": item.get("created", ""),
+                "album": album_id,
+            }
+            for item in album_response["data"]["pictures"]
+        ]
+
+    def fetch_gallery(self) -> list:
+        """Fetch gallery items (images and posts) from Aula."""
         gallery_items = []
-        for album in response["data"]["albums"]:
-            album_response = self._session.get(
-                self.apiurl + f"?method=gallery.getAlbum&id={album['id']}",
-                verify=True,
-            ).json()
-            if album_response["status"]["message"] == "OK":
-                for item in album_response["data"]["pictures"]:
-                    gallery_items.append(
-                        {
-                            "title": item.get("title", ""),
-                            "url": item.get("url", ""),
-                            "created": item.get("created", ""),
-                        }
-                    )
+        for album in self.fetch_albums():
+            gallery_items.extend(self.fetch_album(album["id"]))
 
         _LOGGER.debug(f"Gallery items: {gallery_items}")
         return gallery_items
 
     def custom_api_call(self, uri: str, post_data: str = None) -> dict:
         """Make a custom API call to Aula."""
-        self._ensure_session()
+        self.ensure_session()
         csrf_token = self._session.cookies.get_dict()["Csrfp-Token"]
         headers = {"csrfp-token": csrf_token, "content-type": "application/json"}
 
         if post_data:
             try:
                 json.loads(post_data)
-                response = self._session.post(
+                response = self.post(
                     self.apiurl + uri,
                     headers=headers,
                     json=json.loads(post_data),
@@ -365,9 +641,7 @@ class AulaClient:
                 _LOGGER.error("Invalid JSON in post_data")
                 return {"result": "Fail - invalid JSON"}
         else:
-            response = self._session.get(
-                self.apiurl + uri, headers=headers, verify=True
-            )
+            response = self.get(self.apiurl + uri, headers=headers, verify=True)
 
         try:
             return response.json()
@@ -0,0 +1,201 @@
+"""Compact, typed projections of Aula API payloads.
+
+The raw Aula responses are large and mostly irrelevant for the LLM, so the agent
+tools project them onto these small models before handing them to the model.
+"""
+
+import datetime
+import zoneinfo
+from typing import Any, Iterable
+
+from pydantic import BaseModel, ConfigDict
+
+from src.html_utils import html_to_text
+
+# Aula sends UTC timestamps; users read times and dates in Danish local time
+AULA_TIMEZONE = zoneinfo.ZoneInfo("Europe/Copenhagen")
+
+# Presence status codes used by presence.getDailyOverview
+PRESENCE_STATUS = {
+    0: "ikke kommet",
+    1: "syg",
+    2: "ferie/fri",
+    3: "til stede",
+    4: "på tur",
+    5: "sover",
+    8: "gået hjem",
+}
+
+
+class CompactModel(BaseModel):
+    """Base model for LLM facing data, serialized without empty fields."""
+
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+    def compact(self, fields: Iterable[str] | None = None) -> dict[str, Any]:
+        """Dump the model without None/default values.
+
+        Args:
+            fields: Optional subset of field names to keep
+        """
+        include = set(fields) & set(type(self).model_fields) if fields else None
+        return self.model_dump(
+            include=include, exclude_none=True, exclude_defaults=True
+        )
+
+
+class ChildInfo(CompactModel):
+    id: int
+    name: str
+    institution: str | None = None
+
+    @classmethod
+    def from_aula(cls, child: dict) -> "ChildInfo":
+        return cls(
+            id=child["id"],
+            name=child["name"],
+            institution=child.get("institutionProfile", {}).get("institutionName"),
+        )
+
+
+class Presence(CompactModel):
+    child: str
+    status: str | None = None
+    check_in: str | None = None
+    check_out: str | None = None
+    entry: str | None = None
+    exit: str | None = None
+    exit_with: str | None = None
+    location: str | None = None
+    comment: str | None = None
+
+    @classmethod
+    def from_aula(cls, child: str, overview: dict | None) -> "Presence":
+        if not overview:
+            return cls(child=child)
+        location = overview.get("location")
+        return cls(
+            child=child,
+            status=PRESENCE_STATUS.get(overview.get("status"), overview.get("status")),
+            check_in=_hhmm(overview.get("checkInTime")),
+            check_out=_hhmm(overview.get("checkOutTime")),
+            entry=_hhmm(overview.get("entryTime")),
+            exit=_hhmm(overview.get("exitTime")),
+            exit_with=overview.get("exitWith") or None,
+            location=location.get("name") if isinstance(location, dict) else location,
+            comment=overview.get("comment") or None,
+        )
+
+
+class CalendarEvent(CompactModel):
+    id: int | str | None = None
+    title: str
+    date: str
+    start: str | None = None
+    end: str | None = None
+    all_day: bool = False
+    type: str | None = None
+    location: str | None = None
+    teacher: str | None = None
+
+    @classmethod
+    def from_aula(cls, event: dict) -> "CalendarEvent":
+        start = parse_aula_datetime(event["startDateTime"])
+        end = (
+            parse_aula_datetime(event["endDateTime"])
+            if event.get("endDateTime")
+            else None
+        )
+        all_day = bool(event.get("allDay"))
+        participants = (event.get("lesson") or {}).get("participants") or [{}]
+        resource = event.get("primaryResource") or {}
+        return cls(
+            id=event.get("id"),
+            title=event.get("title") or "",
+            date=start.strftime("%Y-%m-%d"),
+            start=None if all_day else start.strftime("%H:%M"),
+            end=None if all_day or end is None else end.strftime("%H:%M"),
+            all_day=all_day,
+            type=event.get("type"),
+            location=resource.get("name") or event.get("primaryResourceText") or None,
+            teacher=participants[0].get("teacherName") or None,
+        )
+
+
+class Message(CompactModel):
+    sender: str | None = None
+    date: str | None = None
+    text: str = ""
+
+
+class Thread(CompactModel):
+    id: int | str
+    subject: str | None = None
+    messages: list[Message] = []
+
+    @classmethod
+    def from_messages(
+        cls, thread_id: int | str, thread: dict, max_chars: int | None = None
+    ) -> "Thread":
+        """Build a thread from the structure returned by AulaClient.fetch_messages."""
+        text = thread.get("text", [])
+        if isinstance(text, str):
+            # Sensitive threads only carry a single notice text
+            entries = [{"text": text, "sender": thread.get("sender")}]
+        else:
+            entries = text
+        messages = []
+        for entry in entries:
+            body = html_to_text(entry.get("text"))
+            if max_chars and len(body) > max_chars:
+                body = body[:max_chars].rstrip() + "…"
+            messages.append(
+                Message(sender=entry.get("sender"), date=entry.get("date"), text=body)
+            )
+        return cls(id=thread_id, subject=thread.get("subject"), messages=messages)
+
+
+def local_today() -> datetime.date:
+    """Return today's date in Danish local time."""
+    return datetime.datetime.now(AULA_TIMEZONE).date()
+
+
+def parse_aula_datetime(value: str) -> datetime.datetime:
+    """Parse an Aula ISO timestamp (e.g. "2025-03-17T07:00:00+00:00") to local time.
+
+    Timestamps without an offset are taken to already be in local time.
+    """
+    parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=AULA_TIMEZONE)
+    return parsed.astimezone(AULA_TIMEZONE)
+
+
+def _hhmm(value: str | None) -> str | None:
+    """Shorten Aula time strings ("07:45:00" or ISO timestamps) to HH:MM."""
+    if not value:
+        return None
+    if "T" in value:
+        return parse_aula_datetime(value).strftime("%H:%M")
+    return value[:5]
+
+
+def compact_list(
+    items: Iterable[CompactModel],
+    fields: Iterable[str] | None = None,
+    limit: int | None = None,
+) -> list[dict[str, Any]]:
+    """Dump a sequence of models compactly, optionally limited and field-selected.
+
+    Args:
+        items: Models to dump
+        fields: Optional subset of field names to keep
+        limit: Maximum number of items to return
+    """
+    fields = list(fields) if fields else None
+    result = []
+    for item in items:
+        if limit is not None and len(result) >= limit:
+            break
+        result.append(item.compact(fields))
+    return result
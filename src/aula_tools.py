@@ -0,0 +1,220 @@
+import datetime
+from collections import defaultdict
+
+from src.archive import Archive
+from src.aula_client import AulaClient
+from src.aula_models import (
+    CalendarEvent,
+    ChildInfo,
+    Presence,
+    Thread,
+    compact_list,
+    local_today,
+)
+from src.calendar_store import CalendarStore, resolve_range
+from src.digest import family_digest
+from src.message_index import MessageIndex
+
+# region aula_agent
+
+
+class AulaTools:
+    """Token-efficient agent tools on top of an AulaClient.
+
+    The tools project the raw Aula payloads onto the compact models in
+    src.aula_models, so only the fields the LLM needs end up in the prompt.
+    """
+
+    def __init__(
+        self,
+        client: AulaClient,
+        index: MessageIndex | None = None,
+        calendar: CalendarStore | None = None,
+        archive: Archive | None = None,
+    ):
+        self.client = client
+        self.index = index or MessageIndex()
+        self.calendar = calendar or CalendarStore()
+        self.archive = archive
+
+    def set_active_child(self, name: str) -> str:
+        """Set which child profile the other tools operate on.
+
+        Args:
+            name: The child's first name.
+        """
+        self.client.set_active_child(name)
+        return f"Active child: {name}"
+
+    def fetch_basic_data(self) -> list[dict]:
+        """Return the children on the account with their institution."""
+        children = [
+            ChildInfo.from_aula(child)
+            for profile in self.client.profiles
+            for child in profile["children"]
+        ]
+        return compact_list(children)
+
+    def fetch_daily_overview(self, fields: list[str] | None = None) -> dict | str:
+        """Return today's presence for the active child.
+
+        Args:
+            fields: Optional subset of fields, e.g. ["status", "check_out"].
+        """
+        overview = self.client.fetch_daily_overview()
+        if isinstance(overview, Exception):
+            return str(overview)
+        _, data = next(iter(overview.items()))
+        return Presence.from_aula(self.client.active_child, data).compact(fields)
+
+    def fetch_messages(
+        self,
+        limit: int = 5,
+        max_chars: int = 1500,
+        fields: list[str] | None = None,
+    ) -> list[dict]:
+        """Fetch the latest message threads as plain text.
+
+        Args:
+            limit: Maximum number of threads, newest first.
+            max_chars: Truncate each message body to this many characters.
+            fields: Optional subset of thread fields, e.g. ["subject"].
+        """
+        messages = self.client.fetch_messages(limit=limit)
+        threads = (
+            Thread.from_messages(thread_id, thread, max_chars=max_chars)
+            for thread_id, thread in messages.items()
+        )
+        return compact_list(threads, fields=fields, limit=limit)
+
+    def fetch_calendar(
+        self,
+        days: int = 7,
+        limit: int = 50,
+        fields: list[str] | None = None,
+    ) -> dict[str, list[dict]] | str:
+        """Fetch the active child's calendar for the next N days, grouped by date.
+
+        Args:
+            days: Number of days ahead to include.
+            limit: Maximum number of events in total.
+            fields: Optional subset of event fields, e.g. ["title", "start"].
+        """
+        today = local_today()
+        end = today + datetime.timedelta(days=days)
+        return self._calendar(today, end, limit, fields)
+
+    def fetch_calendar_period(
+        self,
+        when: str,
+        limit: int = 50,
+        fields: list[str] | None = None,
+    ) -> dict[str, list[dict]] | str:
+        """Fetch the active child's calendar for a period, grouped by date.
+
+        Args:
+            when: The period, e.g. "today", "tomorrow", "this week", "next tuesday",
+                "last friday", "next 3 days", "2025-03-17" or "2025-03-17..2025-03-21".
+            limit: Maximum number of events in total.
+            fields: Optional subset of event fields, e.g. ["title", "start"].
+        """
+        try:
+            start, end = resolve_range(when)
+        except ValueError as e:
+            return str(e)
+        return self._calendar(start, end, limit, fields)
+
+    def _calendar(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        limit: int,
+        fields: list[str] | None,
+    ) -> dict[str, list[dict]] | str:
+        child_id = self.client.get_child_id()
+        if isinstance(child_id, Exception):
+            return str(child_id)
+        events = self.calendar.events(self.client, child_id, start, end)[:limit]
+        fields = [f for f in fields if f != "date"] if fields else None
+        by_day = defaultdict(list)
+        for event in events:
+            by_day[event.date].append(event.compact(fields))
+        return dict(by_day)
+
+    def search_messages(
+        self,
+        query: str,
+        child: str | None = None,
+        since: str | None = None,
+        limit: int = 5,
+    ) -> list[dict]:
+        """Search all Aula messages and return the best matching snippets.
+
+        Args:
+            query: Keywords to search for, e.g. "skovtur madpakke".
+            child: Only include threads regarding this child (first name).
+            since: Only include messages sent on or after this date (YYYY-MM-DD).
+            limit: Maximum number of snippets.
+        """
+        self.index.sync_if_stale(self.client)
+        return self.index.search(query, child=child, since=since, limit=limit)
+
+    def fetch_family_digest(self, days: int = 1, message_limit: int = 5) -> dict:
+        """Return presence and calendar for all children plus latest messages and albums.
+
+        Args:
+            days: Number of calendar days to include, starting today.
+            message_limit: Number of latest message threads to include.
+        """
+        return family_digest(self.client, days=days, message_limit=message_limit)
+
+    def query_archive(
+        self,
+        kind: str,
+        child: str | None = None,
+        start: str | None = None,
+        end: str | None = None,
+        limit: int = 20,
+    ) -> list[dict] | str:
+        """Look up historical Aula data in the local archive.
+
+        Args:
+            kind: "calendar", "messages", "presence" or "gallery".
+            child: Only include records for this child (first name).
+            start: First date to include (YYYY-MM-DD).
+            end: Last date to include (YYYY-MM-DD).
+            limit: Maximum number of records.
+        """
+        if self.archive is None:
+            return "No archive available. Run `python -m src.archive sync` first."
+        records = self.archive.query(
+            kind, child=child, start=start, end=end, limit=limit
+        )
+        if kind == "calendar":
+            return [
+                {"child": r["child"], **CalendarEvent.from_aula(r).compact()}
+                for r in records
+            ]
+        if kind == "presence":
+            return [
+                {"date": r["day"], **Presence.from_aula(r["child"], r).compact()}
+                for r in records
+            ]
+        if kind == "messages":
+            return [
+                {
+                    "child": r["child"],
+                    "date": (r.get("sent") or "")[:16].replace("T", " "),
+                    "sender": r.get("sender"),
+                    "subject": r.get("subject"),
+                    "text": (r.get("text") or "")[:500],
+                }
+                for r in records
+            ]
+        return [
+            {"date": r["day"], "id": r.get("id"), "title": r.get("title")}
+            for r in records
+        ]
+
+
+# endregion
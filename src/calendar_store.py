@@ -0,0 +1,274 @@
+"""Persistent calendar store with range queries and per-day delta refresh.
+
+Events are kept in SQLite indexed by child and start time, with timestamps
+parsed once on insert. Each child/day remembers when it was last fetched, so a
+query only goes to Aula for the days in its range that are missing or stale.
+"""
+
+import datetime
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from src.aula_client import AulaClient
+from src.aula_models import (
+    AULA_TIMEZONE,
+    CalendarEvent,
+    local_today,
+    parse_aula_datetime,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    child_id INTEGER NOT NULL,
+    event_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (child_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS events_child_start ON events (child_id, start_ts);
+CREATE TABLE IF NOT EXISTS fetched_days (
+    child_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (child_id, day)
+);
+"""
+
+WEEKDAYS = {
+    "monday": 0,
+    "mandag": 0,
+    "tuesday": 1,
+    "tirsdag": 1,
+    "wednesday": 2,
+    "onsdag": 2,
+    "thursday": 3,
+    "torsdag": 3,
+    "friday": 4,
+    "fredag": 4,
+    "saturday": 5,
+    "lørdag": 5,
+    "sunday": 6,
+    "søndag": 6,
+}
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+# Prefixes accepted before a weekday name
+_THIS_PREFIXES = ("", "on", "this", "på", "denne", "på denne")
+_NEXT_PREFIXES = ("next", "næste", "på næste")
+_PAST_PREFIXES = ("last", "sidste", "forrige", "i sidste")
+
+
+class CalendarStore:
+    """Local store of Aula calendar events for all children on an account."""
+
+    def __init__(self, path: str | Path = ":memory:", max_age: float = 900):
+        """Open (or create) the store.
+
+        Args:
+            path: SQLite database file, ":memory:" for a transient store
+            max_age: Seconds before a fetched day is considered stale
+        """
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.max_age = max_age
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def events(
+        self,
+        client: AulaClient,
+        child_id: int,
+        start: datetime.date,
+        end: datetime.date,
+    ) -> list[CalendarEvent]:
+        """Return a child's events in [start, end), refreshing only stale days.
+
+        Args:
+            client: Client used to refresh missing or stale days
+            child_id: Aula institution profile id of the child
+            start: First day to include
+            end: Day after the last day to include
+        """
+        for range_start, range_end in self._stale_ranges(child_id, start, end):
+            self.refresh(client, range_start, range_end)
+        return self.query(child_id, start, end)
+
+    def query(
+        self, child_id: int, start: datetime.date, end: datetime.date
+    ) -> list[CalendarEvent]:
+        """Return stored events in [start, end) without contacting Aula."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM events WHERE child_id = ? "
+                "AND start_ts >= ? AND start_ts < ? ORDER BY start_ts",
+                (child_id, _timestamp(start), _timestamp(end)),
+            ).fetchall()
+        return [CalendarEvent.model_validate_json(data) for (data,) in rows]
+
+    def refresh(
+        self, client: AulaClient, start: datetime.date, end: datetime.date
+    ) -> bool:
+        """Replace the stored events in [start, end) for all children with fresh data.
+
+        Returns:
+            False if Aula did not return any data
+        """
+        response = client.fetch_calendar_range(start, end)
+        if response is None:
+            return False
+        child_ids = list(client.ids.values())
+        lower, upper = _timestamp(start), _timestamp(end)
+        rows = []
+        for event in response:
+            start_dt = parse_aula_datetime(event["startDateTime"])
+            if not lower <= start_dt.timestamp() < upper:
+                continue
+            end_dt = (
+                parse_aula_datetime(event["endDateTime"])
+                if event.get("endDateTime")
+                else None
+            )
+            data = CalendarEvent.from_aula(event).model_dump_json(exclude_none=True)
+            event_id = str(
+                event.get("id") or f"{event['startDateTime']}{event.get('title')}"
+            )
+            for child_id in event.get("belongsToProfiles", []):
+                if child_id in child_ids:
+                    rows.append(
+                        (
+                            child_id,
+                            event_id,
+                            start_dt.strftime("%Y-%m-%d"),
+                            start_dt.timestamp(),
+                            end_dt.timestamp() if end_dt else None,
+                            data,
+                        )
+                    )
+        now = time.time()
+        days = [d.isoformat() for d in _days(start, end)]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM events WHERE child_id = ? AND start_ts >= ? AND start_ts < ?",
+                [(c, lower, upper) for c in child_ids],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO fetched_days VALUES (?, ?, ?)",
+                [(c, day, now) for c in child_ids for day in days],
+            )
+        _LOGGER.debug(f"Refreshed calendar {start} - {end}: {len(rows)} events")
+        return True
+
+    def _stale_ranges(
+        self, child_id: int, start: datetime.date, end: datetime.date
+    ) -> list[tuple[datetime.date, datetime.date]]:
+        """Group the missing or stale days in [start, end) into contiguous ranges."""
+        with self._lock:
+            fresh = {
+                day
+                for (day,) in self._conn.execute(
+                    "SELECT day FROM fetched_days WHERE child_id = ? "
+                    "AND day >= ? AND day < ? AND fetched_at >= ?",
+                    (
+                        child_id,
+                        start.isoformat(),
+                        end.isoformat(),
+                        time.time() - self.max_age,
+                    ),
+                )
+            }
+        ranges = []
+        for day in _days(start, end):
+            if day.isoformat() in fresh:
+                continue
+            if ranges and ranges[-1][1] == day:
+                ranges[-1][1] = day + datetime.timedelta(days=1)
+            else:
+                ranges.append([day, day + datetime.timedelta(days=1)])
+        return [tuple(r) for r in ranges]
+
+
+def resolve_range(
+    when: str, today: datetime.date | None = None
+) -> tuple[datetime.date, datetime.date]:
+    """Turn a human description of a period into a [start, end) date range.
+
+    Understands "today", "tomorrow", "this week", "next week", weekday names in
+    English or Danish (optionally prefixed with "next"/"næste" or
+    "last"/"sidste"/"forrige"), "next N days", an ISO date or two ISO dates
+    ("2025-03-17..2025-03-21").
+
+    Args:
+        when: The period description
+        today: Reference date, defaults to the current local date
+
+    Raises:
+        ValueError: If the description is not understood
+    """
+    today = today or local_today()
+    one_day = datetime.timedelta(days=1)
+    text = when.strip().lower()
+
+    dates = _ISO_DATE.findall(text)
+    if len(dates) >= 2:
+        first, last = (datetime.date.fromisoformat(d) for d in dates[:2])
+        return first, last + one_day
+    if len(dates) == 1:
+        day = datetime.date.fromisoformat(dates[0])
+        return day, day + one_day
+
+    if text in ("today", "i dag", "idag"):
+        return today, today + one_day
+    if text in ("tomorrow", "i morgen", "imorgen"):
+        return today + one_day, today + 2 * one_day
+
+    monday = today - datetime.timedelta(days=today.weekday())
+    if text in ("this week", "denne uge", "week", "ugen"):
+        return monday, monday + datetime.timedelta(days=7)
+    if text in ("next week", "næste uge"):
+        return monday + datetime.timedelta(days=7), monday + datetime.timedelta(days=14)
+
+    match = re.fullmatch(r"(?:next|de næste) (\d+) (?:days|dage)", text)
+    if match:
+        return today, today + datetime.timedelta(days=int(match.group(1)))
+
+    words = text.split()
+    if words and words[-1] in WEEKDAYS:
+        weekday = WEEKDAYS[words[-1]]
+        prefix = " ".join(words[:-1])
+        if prefix in _PAST_PREFIXES:
+            day = today - datetime.timedelta(days=(today.weekday() - weekday) % 7 or 7)
+            return day, day + one_day
+        if prefix in _NEXT_PREFIXES or prefix in _THIS_PREFIXES:
+            ahead = (weekday - today.weekday()) % 7
+            if prefix in _NEXT_PREFIXES and ahead == 0:
+                ahead = 7
+            day = today + datetime.timedelta(days=ahead)
+            return day, day + one_day
+
+    raise ValueError(f"Could not understand the period {when!r}")
+
+
+def _days(start: datetime.date, end: datetime.date):
+    day = start
+    while day < end:
+        yield day
+        day += datetime.timedelta(days=1)
+
+
+def _timestamp(day: datetime.date) -> float:
+    """Return the timestamp of local midnight at the start of a date."""
+    return datetime.datetime.combine(day, datetime.time(), AULA_TIMEZONE).timestamp()
@@ -0,0 +1,90 @@
+"""Family digest: everything for all children in one compact structure.
+
+Instead of walking set_active_child -> presence -> calendar -> messages per
+child, the digest issues one deduplicated call per data source for the whole
+account (presence and calendar accept all children at once, messages and the
+gallery are per account) and runs them concurrently.
+"""
+
+import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from src.aula_client import AulaClient
+from src.aula_models import (
+    CalendarEvent,
+    Presence,
+    Thread,
+    compact_list,
+    local_today,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def family_digest(
+    client: AulaClient, days: int = 1, message_limit: int = 5, album_limit: int = 3
+) -> dict:
+    """Build a digest for all children on an account.
+
+    Args:
+        client: Client for the account
+        days: Number of calendar days to include, starting today
+        message_limit: Number of latest message threads to include
+        album_limit: Number of latest gallery albums to include
+
+    Returns:
+        {"date", "children": {name: {"presence", "calendar"}}, "messages", "albums"}
+    """
+    # Log in once up front so the concurrent fetches share the session
+    client.ensure_session()
+    today = local_today()
+    end = today + datetime.timedelta(days=days)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        presence = pool.submit(client.fetch_presence)
+        calendar = pool.submit(client.fetch_calendar_range, today, end)
+        messages = pool.submit(client.fetch_messages, limit=message_limit)
+        albums = pool.submit(client.fetch_albums)
+
+    children = {}
+    overviews = _result(presence, "presence", {})
+    events = _result(calendar, "calendar", None) or []
+    for name, child_id in client.ids.items():
+        child_events = sorted(
+            (
+                CalendarEvent.from_aula(event)
+                for event in events
+                if child_id in event.get("belongsToProfiles", [])
+            ),
+            key=lambda event: (event.date, event.start or ""),
+        )
+        children[name] = {
+            "presence": Presence.from_aula(name, overviews.get(child_id)).compact(
+                [f for f in Presence.model_fields if f != "child"]
+            ),
+            "calendar": compact_list(child_events),
+        }
+
+    threads = (
+        Thread.from_messages(thread_id, thread, max_chars=500)
+        for thread_id, thread in _result(messages, "messages", {}).items()
+    )
+    return {
+        "date": today.isoformat(),
+        "children": children,
+        "messages": compact_list(threads, limit=message_limit),
+        "albums": [
+            {"id": album["id"], "title": album.get("title")}
+            for album in _result(albums, "albums", [])[:album_limit]
+        ],
+    }
+
+
+def _result(future, name: str, default):
+    """Return a future's result, or the default if that part of the digest failed."""
+    try:
+        return future.result()
+    except Exception as e:
+        _LOGGER.warning(f"Digest could not fetch {name}: {e}")
+        return default
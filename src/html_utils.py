@@ -0,0 +1,113 @@
+import html
+import re
+from html.parser import HTMLParser
+
+# Tags that should break the text flow when converting Aula HTML to plain text.
+_BLOCK_TAGS = {
+    "br",
+    "p",
+    "div",
+    "li",
+    "ul",
+    "ol",
+    "tr",
+    "table",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+}
+_SKIP_TAGS = {"script", "style", "head"}
+_SPACES = re.compile(r"[ \t\r\f\v]+")
+_NEWLINES = re.compile(r"\n\s*\n+")
+
+
+class _TextExtractor(HTMLParser):
+    """Collect the visible text of an HTML fragment."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts: list[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in _BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._parts.append(data)
+
+    def text(self) -> str:
+        text = _SPACES.sub(" ", "".join(self._parts))
+        text = "\n".join(line.strip() for line in text.split("\n"))
+        return _NEWLINES.sub("\n", text).strip()
+
+
+def html_to_text(value: str | None) -> str:
+    """Convert an HTML fragment (e.g. an Aula message body) to compact plain text.
+
+    Args:
+        value: HTML string, may also be plain text or None
+
+    Returns:
+        The visible text with whitespace collapsed
+    """
+    if not value:
+        return ""
+    if "<" not in value:
+        return _SPACES.sub(" ", html.unescape(value)).strip()
+    parser = _TextExtractor()
+    parser.feed(value)
+    parser.close()
+    return parser.text()
+
+
+class _FormExtractor(HTMLParser):
+    """Collect the action of the first form and every named input in a page."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.action: str | None = None
+        self.inputs: dict[str, str] = {}
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "form" and self.action is None:
+            self.action = dict(attrs).get("action")
+        elif tag == "input":
+            attrs = dict(attrs)
+            if attrs.get("name") is not None and attrs.get("value") is not None:
+                self.inputs[attrs["name"]] = attrs["value"]
+
+
+def extract_form(page: str) -> tuple[str, dict[str, str]]:
+    """Extract the action of the first form and the named input values of a page.
+
+    Like the BeautifulSoup lookup it replaces, inputs are collected from the whole
+    page, also outside the form. No document tree is built.
+
+    Args:
+        page: HTML of the page
+
+    Returns:
+        The form action and a {name: value} dict of the inputs
+
+    Raises:
+        ValueError: If the page has no form with an action
+    """
+    parser = _FormExtractor()
+    parser.feed(page)
+    parser.close()
+    if not parser.action:
+        raise ValueError("No form found in login page")
+    return parser.action, parser.inputs
@@ -1,8 +1,11 @@
+from functools import lru_cache
+
 from openai import AsyncAzureOpenAI, AzureOpenAI
 
 from config import app_settings
 
 
+@lru_cache
 def get_openai_client() -> AzureOpenAI:
     """Callable function that allows the llm client to be instatiated from other scripts."""
     return AzureOpenAI(
@@ -12,8 +15,13 @@ def get_openai_client() -> AzureOpenAI:
     )
 
 
+@lru_cache
 def get_async_openai_client() -> AsyncAzureOpenAI:
-    """Callable function that allows the llm client to be instatiated from other scripts."""
+    """Callable function that allows the llm client to be instatiated from other scripts.
+
+    The client is created once and reused, so agents built per request (and per
+    fallback attempt) share its connection pool.
+    """
     return AsyncAzureOpenAI(
         api_version=app_settings().API_VERSION,
         api_key=app_settings().AZURE_OPENAI_API_KEY.get_secret_value(),
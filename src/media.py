@@ -0,0 +1,301 @@
+"""Download pipeline for Aula gallery media.
+
+Pictures are streamed through the authenticated Aula session in chunks into a
+content-addressed disk cache (files named by their sha256), with bounded
+concurrency, resumable partial downloads and size-based LRU eviction.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.aula_client import AulaClient
+
+_LOGGER = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    key TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    suffix TEXT NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS media_sha256 ON media (sha256);
+"""
+
+
+class MediaCache:
+    """Content-addressed on-disk cache with size-based LRU eviction."""
+
+    def __init__(self, root: str | Path, max_bytes: int = 1024 * 1024 * 1024):
+        """Open (or create) the cache.
+
+        Args:
+            root: Directory holding the cached files and their index
+            max_bytes: Total size above which the least recently used files are evicted
+        """
+        self.root = Path(root)
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        (self.root / "partial").mkdir(exist_ok=True)
+        self.max_bytes = max_bytes
+        self._conn = sqlite3.connect(
+            str(self.root / "index.db"), check_same_thread=False
+        )
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Path | None:
+        """Return the cached file for a key, or None if it is not cached."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT sha256, suffix FROM media WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            path = self._object_path(*row)
+            if not path.exists():
+                self._conn.execute("DELETE FROM media WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE media SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+        return path
+
+    def partial_path(self, key: str) -> Path:
+        """Return where an unfinished download for a key is kept."""
+        name = hashlib.sha1(key.encode()).hexdigest()
+        return self.root / "partial" / f"{name}.part"
+
+    @contextmanager
+    def lock(self, key: str, timeout: float = 600):
+        """Hold the download lock for a key, across threads and processes on the host.
+
+        The lock is a file created with O_EXCL next to the partial download. A
+        lock file older than timeout is considered left behind by a crashed
+        process and is taken over.
+
+        Raises:
+            TimeoutError: If the lock is not released within timeout seconds
+        """
+        path = self.partial_path(key).with_suffix(".lock")
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                try:
+                    stale = time.time() - path.stat().st_mtime > timeout
+                except FileNotFoundError:
+                    continue
+                if stale:
+                    path.unlink(missing_ok=True)
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Download of {key} is locked elsewhere")
+                time.sleep(0.2)
+        try:
+            yield
+        finally:
+            path.unlink(missing_ok=True)
+
+    def commit(self, key: str, partial: Path, suffix: str = "") -> Path:
+        """Move a finished download into the cache under its content hash."""
+        digest = hashlib.sha256()
+        with partial.open("rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+        path = self._object_path(sha256, suffix)
+        path.parent.mkdir(exist_ok=True)
+        size = partial.stat().st_size
+        if path.exists():
+            # Same content already cached under another key
+            partial.unlink()
+        else:
+            os.replace(partial, path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?)",
+                (key, sha256, size, suffix, time.time()),
+            )
+        self.evict(keep=sha256)
+        return path
+
+    def size(self) -> int:
+        """Return the total size of the cached files in bytes."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM "
+                "(SELECT size FROM media GROUP BY sha256)"
+            ).fetchone()
+        return row[0]
+
+    def evict(self, keep: str | None = None) -> int:
+        """Delete least recently used files until the cache fits in max_bytes.
+
+        Args:
+            keep: sha256 of a file that must not be evicted, e.g. one just
+                committed that is about to be served
+
+        Returns:
+            Number of bytes freed
+        """
+        freed = 0
+        with self._lock, self._conn:
+            objects = self._conn.execute(
+                "SELECT sha256, suffix, MAX(size), MAX(last_access) AS accessed "
+                "FROM media GROUP BY sha256 ORDER BY accessed"
+            ).fetchall()
+            total = sum(size for _, _, size, _ in objects)
+            for sha256, suffix, size, _ in objects:
+                if total <= self.max_bytes:
+                    break
+                if sha256 == keep:
+                    continue
+                self._object_path(sha256, suffix).unlink(missing_ok=True)
+                self._conn.execute("DELETE FROM media WHERE sha256 = ?", (sha256,))
+                total -= size
+                freed += size
+        if freed:
+            _LOGGER.debug(f"Evicted {freed} bytes from media cache")
+        return freed
+
+    def _object_path(self, sha256: str, suffix: str) -> Path:
+        return self.root / "objects" / sha256[:2] / f"{sha256}{suffix}"
+
+
+class MediaDownloader:
+    """Concurrent, resumable downloads of Aula media into a MediaCache."""
+
+    def __init__(
+        self,
+        client: AulaClient,
+        cache: MediaCache,
+        max_workers: int = 4,
+        chunk_size: int = 64 * 1024,
+        timeout: float = 30,
+    ):
+        """Create a downloader.
+
+        Args:
+            client: Authenticated client whose session is used for downloads
+            cache: Cache the files are stored in
+            max_workers: Maximum number of concurrent downloads
+            chunk_size: Bytes read from the network per chunk
+            timeout: Connect/read timeout per request in seconds
+        """
+        self.client = client
+        self.cache = cache
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+
+    def download(self, url: str, key: str | None = None) -> Path:
+        """Download a file into the cache, or return it if it is already cached.
+
+        Unfinished downloads are resumed with an HTTP Range request. Concurrent
+        downloads of the same key wait for each other instead of writing to the
+        same partial file.
+
+        Args:
+            url: URL of the file
+            key: Stable cache key, defaults to the URL. Use the picture id for
+                Aula pictures, since their signed URLs change over time.
+        """
+        key = key or url
+        cached = self.cache.get(key)
+        if cached:
+            return cached
+        with self.cache.lock(key):
+            # Another download of the key may have finished while we waited
+            return self.cache.get(key) or self._download(url, key)
+
+    def _download(self, url: str, key: str) -> Path:
+        self.client.ensure_session()
+        partial = self.cache.partial_path(key)
+        offset = partial.stat().st_size if partial.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        with self.client.get(
+            url, headers=headers, stream=True, timeout=self.timeout, verify=True
+        ) as response:
+            if response.status_code == 416:
+                # Nothing left to fetch, the partial file is complete
+                pass
+            else:
+                response.raise_for_status()
+                mode = "ab" if response.status_code == 206 else "wb"
+                with partial.open(mode) as f:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        f.write(chunk)
+            suffix = _suffix(url, response.headers.get("content-type", ""))
+        return self.cache.commit(key, partial, suffix)
+
+    def download_many(self, items: list[dict]) -> dict[str, Path | Exception]:
+        """Download several files concurrently.
+
+        Args:
+            items: Dicts with a "url" and optionally a stable "key"
+
+        Returns:
+            Mapping from key to the cached file, or the exception that stopped it
+        """
+        urls = {
+            item.get("key") or item["url"]: item["url"]
+            for item in items
+            if item.get("url")
+        }
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                pool.submit(self.download, url, key): key for key, url in urls.items()
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    _LOGGER.warning(f"Failed to download {key}: {e}")
+                    results[key] = e
+        return results
+
+    def download_album(self, album_id: int | str) -> dict:
+        """Download every picture of an album.
+
+        Safe to call again after an interruption: cached pictures are skipped
+        and partially downloaded ones are resumed.
+
+        Returns:
+            Summary with the number of downloaded, cached and failed pictures
+        """
+        pictures = self.client.fetch_album(album_id)
+        items = [
+            {"url": p["url"], "key": f"picture:{p['id']}" if p.get("id") else None}
+            for p in pictures
+        ]
+        cached = sum(1 for item in items if self.cache.get(item["key"] or item["url"]))
+        results = self.download_many(items)
+        failed = [key for key, value in results.items() if isinstance(value, Exception)]
+        return {
+            "album": album_id,
+            "pictures": len(items),
+            "cached": cached,
+            "downloaded": len(results) - len(failed) - cached,
+            "failed": failed,
+        }
+
+
+def _suffix(url: str, content_type: str) -> str:
+    """Pick a file extension from the URL or the content type."""
+    name = url.split("?", 1)[0].rsplit("/", 1)[-1]
+    if "." in name and len(name.rsplit(".", 1)[1]) <= 5:
+        return "." + name.rsplit(".", 1)[1].lower()
+    subtype = content_type.split(";")[0].split("/")[-1].strip()
+    return f".{subtype}" if subtype else ""
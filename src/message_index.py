@@ -0,0 +1,274 @@
+"""Local full-text search index over Aula message threads.
+
+Threads are synced incrementally from Aula into a SQLite FTS5 table, so questions
+about old messages can be answered with a few matching snippets instead of
+pulling and reading the whole mailbox.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from src.aula_client import AulaClient
+from src.html_utils import html_to_text
+
+_LOGGER = logging.getLogger(__name__)
+_WORDS = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    id TEXT PRIMARY KEY,
+    subject TEXT,
+    latest TEXT,
+    children TEXT
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5(
+    subject,
+    sender,
+    text,
+    message_id UNINDEXED,
+    thread_id UNINDEXED,
+    sent_at UNINDEXED,
+    children UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+class MessageIndex:
+    """SQLite FTS5 index of Aula messages with incremental sync."""
+
+    def __init__(self, path: str | Path = ":memory:", max_pages: int = 10):
+        """Open (or create) the index.
+
+        Args:
+            path: SQLite database file, ":memory:" for a transient index
+            max_pages: Maximum number of thread pages to walk per sync, both for
+                new threads and for the backfill of older ones
+        """
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._backfill_lock = threading.Lock()
+        self.max_pages = max_pages
+        self.last_sync: float | None = None
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def sync(self, client: AulaClient) -> int:
+        """Pull new and updated threads from Aula into the index.
+
+        Threads come newest first, so paging stops at the first page without any
+        changed thread. Threads beyond max_pages are indexed by backfill().
+
+        Returns:
+            Number of messages added
+        """
+        with self._sync_lock:
+            added = 0
+            for page in range(self.max_pages):
+                threads = client.fetch_threads(page=page)
+                if not threads:
+                    break
+                changed = [t for t in threads if self._is_changed(t)]
+                for thread in changed:
+                    added += self._index_thread(client, thread)
+                if not changed:
+                    break
+            self.last_sync = time.monotonic()
+        _LOGGER.debug(f"Message index sync added {added} messages")
+        return added
+
+    @property
+    def backfill_done(self) -> bool:
+        return self._get_state("backfill_page") == "done"
+
+    def backfill(self, client: AulaClient, max_pages: int | None = None) -> int:
+        """Index older threads page by page, continuing from the stored cursor.
+
+        This can take minutes for a large mailbox, so run it in the background
+        (warm_up does). The cursor is saved after every page, so an interrupted
+        backfill resumes where it stopped. New threads only push older ones to
+        later pages, so resuming at the stored page number never skips a thread.
+
+        Args:
+            client: Client for the account
+            max_pages: Stop after this many pages, default all remaining pages
+
+        Returns:
+            Number of messages added
+        """
+        with self._backfill_lock:
+            cursor = self._get_state("backfill_page")
+            if cursor == "done":
+                return 0
+            cursor_page = int(cursor or 0)
+            added = 0
+            page = cursor_page
+            while max_pages is None or page < cursor_page + max_pages:
+                threads = client.fetch_threads(page=page)
+                if not threads:
+                    self._set_state("backfill_page", "done")
+                    break
+                for thread in threads:
+                    if self._is_changed(thread):
+                        added += self._index_thread(client, thread)
+                page += 1
+                self._set_state("backfill_page", str(page))
+        _LOGGER.debug(f"Message index backfill added {added} messages")
+        return added
+
+    def sync_if_stale(self, client: AulaClient, max_age: float = 300) -> int:
+        """Sync unless the last sync is younger than max_age seconds.
+
+        Only new and updated threads are fetched, never the backfill. If a sync
+        is already running, this returns immediately and searches use what is
+        indexed so far.
+        """
+        if self.last_sync is not None and time.monotonic() - self.last_sync < max_age:
+            return 0
+        if self._sync_lock.locked():
+            return 0
+        return self.sync(client)
+
+    def search(
+        self,
+        query: str,
+        child: str | None = None,
+        since: str | None = None,
+        limit: int = 5,
+    ) -> list[dict]:
+        """Search the index and return the best matching snippets.
+
+        Args:
+            query: Free text query, every word must match (prefix matching)
+            child: Only return threads regarding this child (first name)
+            since: Only return messages sent on or after this date (YYYY-MM-DD)
+            limit: Maximum number of results
+        """
+        words = _WORDS.findall(query)
+        if not words:
+            return []
+        match = " ".join(f'"{word}"*' for word in words)
+        sql = (
+            "SELECT subject, sender, sent_at, thread_id, "
+            "snippet(messages, 2, '', '', '…', 24) "
+            "FROM messages WHERE messages MATCH ?"
+        )
+        params: list = [match]
+        if child:
+            sql += " AND children LIKE ?"
+            params.append(f"%|{child.lower()}%")
+        if since:
+            sql += " AND sent_at >= ?"
+            params.append(since)
+        sql += " ORDER BY bm25(messages, 2.0, 1.0, 1.0) LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                "subject": subject,
+                "sender": sender,
+                "date": sent_at,
+                "thread_id": thread_id,
+                "snippet": snippet,
+            }
+            for subject, sender, sent_at, thread_id, snippet in rows
+        ]
+
+    def _get_state(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM sync_state WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (key, value)
+            )
+
+    def _is_changed(self, thread: dict) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT latest FROM threads WHERE id = ?", (str(thread["id"]),)
+            ).fetchone()
+        return row is None or not row[0] or row[0] != _thread_latest(thread)
+
+    def _index_thread(self, client: AulaClient, thread: dict) -> int:
+        thread_id = str(thread["id"])
+        # The thread changed, so a cached body may miss its newest messages
+        response = client.fetch_thread_messages(thread_id, cached=False)
+        if response["status"]["code"] == 403:
+            # Sensitive threads require MitID and cannot be indexed
+            messages = []
+        else:
+            messages = [
+                m
+                for m in response["data"]["messages"]
+                if m.get("messageType") == "Message"
+            ]
+        children = "".join(
+            f"|{child.get('displayName', child.get('name', '')).lower()}"
+            for child in thread.get("regardingChildren") or []
+        )
+        subject = thread.get("subject", "")
+        added = 0
+        with self._lock, self._conn:
+            known = {
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT message_id FROM messages WHERE thread_id = ?", (thread_id,)
+                )
+            }
+            for msg in messages:
+                message_id = str(msg.get("id", msg.get("sendDateTime")))
+                if message_id in known:
+                    continue
+                text = msg.get("text")
+                if isinstance(text, dict):
+                    text = text.get("html", "")
+                self._conn.execute(
+                    "INSERT INTO messages (subject, sender, text, message_id, "
+                    "thread_id, sent_at, children) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        subject,
+                        (msg.get("sender") or {}).get("fullName", "Ukendt afsender"),
+                        html_to_text(text),
+                        message_id,
+                        thread_id,
+                        msg.get("sendDateTime", "")[:16].replace("T", " "),
+                        children,
+                    ),
+                )
+                added += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO threads (id, subject, latest, children) "
+                "VALUES (?, ?, ?, ?)",
+                (thread_id, subject, _thread_latest(thread), children),
+            )
+        return added
+
+
+def _thread_latest(thread: dict) -> str:
+    """Return the marker used to detect whether a thread changed since last sync."""
+    latest = thread.get("latestMessage") or {}
+    return str(
+        latest.get("id")
+        or latest.get("sendDateTime")
+        or thread.get("lastUpdatedDate")
+        or ""
+    )
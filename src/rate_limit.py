@@ -0,0 +1,270 @@
+"""Rate limiting and retries for upstream Aula calls.
+
+Every request goes through a global token bucket and a per-account token bucket.
+Throttled (429) and failed (5xx, connection errors) requests are retried with
+exponential backoff and full jitter, honouring Retry-After, and a 429 also slows
+the account down until requests succeed again. Requests that may have reached
+the server are only retried for idempotent methods.
+"""
+
+import email.utils
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import requests
+
+_LOGGER = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class TokenBucket:
+    """Thread-safe token bucket with an adjustable refill rate."""
+
+    def __init__(self, rate: float, capacity: float):
+        """Create a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (burst size)
+        """
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, returning how many seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            return max(wait, self._blocked_until - now)
+
+    def block(self, seconds: float) -> None:
+        """Hand out no tokens for the next number of seconds."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def slow_down(self, factor: float = 0.5, min_rate: float = 0.2) -> None:
+        """Reduce the refill rate after the upstream throttled us."""
+        with self._lock:
+            self.rate = max(min_rate, self.rate * factor)
+
+    def recover(self, step: float = 0.1) -> None:
+        """Move the refill rate back towards the base rate after a success."""
+        if self.rate < self.base_rate:
+            with self._lock:
+                self.rate = min(self.base_rate, self.rate + self.base_rate * step)
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter."""
+
+    max_retries: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    # Longer Retry-After values are not waited for, the request fails instead
+    max_retry_after: float = 300.0
+    statuses: frozenset[int] = field(default_factory=lambda: RETRY_STATUSES)
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Return the seconds to sleep before retry number `attempt` (from 0).
+
+        A Retry-After from the server is always honoured, even above max_delay.
+        """
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        if retry_after is not None:
+            return max(retry_after, backoff)
+        return backoff
+
+
+class RateLimiter:
+    """Global and per-account rate limiting shared by all Aula clients."""
+
+    def __init__(
+        self,
+        global_rate: float = 10,
+        global_burst: float = 20,
+        account_rate: float = 4,
+        account_burst: float = 8,
+        retry: RetryPolicy | None = None,
+        timeout: float = 30,
+        sleep=time.sleep,
+    ):
+        """Create a limiter.
+
+        Args:
+            global_rate: Requests per second across all accounts
+            global_burst: Burst size across all accounts
+            account_rate: Requests per second for a single account
+            account_burst: Burst size for a single account
+            retry: Retry policy, defaults to RetryPolicy()
+            timeout: Default connect/read timeout per request in seconds
+            sleep: Sleep function, replaceable in tests
+        """
+        self.retry = retry or RetryPolicy()
+        self.timeout = timeout
+        self._global = TokenBucket(global_rate, global_burst)
+        self._account_rate = account_rate
+        self._account_burst = account_burst
+        self._accounts: dict[str, TokenBucket] = {}
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._counts = Counter()
+
+    def _bucket(self, account: str) -> TokenBucket:
+        with self._lock:
+            if account not in self._accounts:
+                self._accounts[account] = TokenBucket(
+                    self._account_rate, self._account_burst
+                )
+            return self._accounts[account]
+
+    def acquire(self, account: str) -> float:
+        """Block until the account may send a request.
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = max(self._bucket(account).reserve(), self._global.reserve())
+        if wait > 0:
+            with self._lock:
+                self._waiting += 1
+                self._counts["throttled"] += 1
+            try:
+                self._sleep(wait)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+        return wait
+
+    def request(
+        self,
+        session: requests.Session,
+        method: str,
+        url: str,
+        account: str,
+        idempotent: bool | None = None,
+        **kwargs,
+    ) -> requests.Response:
+        """Send a request through the limiter, retrying transient failures.
+
+        Requests that are not idempotent (by default anything but GET, HEAD,
+        OPTIONS, PUT and DELETE) are only retried when they cannot have been
+        processed: on connect timeouts and 429 responses.
+
+        Args:
+            session: Session used to send the request
+            method: HTTP method
+            url: Request URL
+            account: Key of the account the request is made for
+            idempotent: Whether the request is safe to repeat, e.g. True for a
+                POST that only reads data. Defaults to deciding by method.
+            **kwargs: Passed on to session.request, with a default timeout
+
+        Raises:
+            requests.HTTPError: If the upstream still fails after all retries, or
+                asks to retry later than RetryPolicy.max_retry_after
+            requests.ConnectionError: If the connection keeps failing
+        """
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        kwargs.setdefault("timeout", self.timeout)
+        bucket = self._bucket(account)
+        for attempt in range(self.retry.max_retries + 1):
+            self.acquire(account)
+            self._count("requests")
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                retryable = idempotent or isinstance(e, requests.ConnectTimeout)
+                if attempt == self.retry.max_retries or not retryable:
+                    self._count("failed")
+                    raise
+                delay = self.retry.delay(attempt)
+                _LOGGER.warning(
+                    f"{method} {url} failed ({e}), retrying in {delay:.1f}s"
+                )
+            else:
+                if response.status_code not in self.retry.statuses or (
+                    not idempotent and response.status_code != 429
+                ):
+                    bucket.recover()
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if attempt == self.retry.max_retries or (
+                    retry_after is not None and retry_after > self.retry.max_retry_after
+                ):
+                    self._count("failed")
+                    response.raise_for_status()
+                delay = self.retry.delay(attempt, retry_after)
+                if response.status_code == 429:
+                    self._count("rate_limited")
+                    bucket.slow_down()
+                    bucket.block(delay)
+                response.close()
+                _LOGGER.warning(
+                    f"{method} {url} returned {response.status_code}, "
+                    f"retrying in {delay:.1f}s"
+                )
+            self._count("retries")
+            self._sleep(delay)
+
+    def stats(self) -> dict:
+        """Return the current queue depth, counters and per-account rates."""
+        with self._lock:
+            return {
+                "queue_depth": self._waiting,
+                **{
+                    key: self._counts[key]
+                    for key in (
+                        "requests",
+                        "throttled",
+                        "rate_limited",
+                        "retries",
+                        "failed",
+                    )
+                },
+                "account_rates": {
+                    account: round(bucket.rate, 2)
+                    for account, bucket in self._accounts.items()
+                },
+            }
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+# Shared by every AulaClient in the process unless another limiter is passed in
+default_limiter = RateLimiter()
@@ -3,8 +3,6 @@ from __future__ import annotations as _annotations
 from dataclasses import dataclass
 from typing import Any
 
-import aiohttp
-from bs4 import BeautifulSoup
 from pydantic_ai import RunContext
 
 from config import app_settings
@@ -27,6 +25,8 @@ async def google_search(query, **kwargs):
         query (str): The search query.
         **kwargs: Additional parameters for the API request.
     """
+    import aiohttp
+
     async with aiohttp.ClientSession() as session:
         async with session.get(
             "https://customsearch.googleapis.com/customsearch/v1",
@@ -73,6 +73,9 @@ async def fetch_url(ctx: RunContext, url: str) -> str:
     Args:
         url (str): The URL to fetch.
     """
+    import aiohttp
+    from bs4 import BeautifulSoup
+
     print(f"Fetching URL: {url}")
     async with aiohttp.ClientSession() as session:
         async with session.get(url) as response:
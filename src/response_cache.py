@@ -0,0 +1,80 @@
+"""In-process cache for agent answers to repeated, non-personal queries."""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+_SPACES = re.compile(r"\s+")
+
+
+@dataclass
+class _Entry:
+    output: str
+    latency: float
+    expires: float
+
+
+class ResponseCache:
+    """LRU cache of agent outputs with a TTL, reporting hit ratio and time saved."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 6 * 3600):
+        """Create an empty cache.
+
+        Args:
+            max_entries: Maximum number of cached answers
+            ttl: Seconds an answer stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+    @staticmethod
+    def key(query: str, model: str, agent: str, date_bucket: str) -> tuple:
+        """Build the cache key for a query.
+
+        The query is lower-cased with whitespace collapsed and trailing punctuation
+        removed. The date bucket is part of the key because the current time is part
+        of the system prompt.
+        """
+        normalized = _SPACES.sub(" ", query).strip().lower().rstrip("?!. ")
+        return (normalized, model, agent, date_bucket)
+
+    def get(self, key: tuple) -> str | None:
+        """Return the cached output for a key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.latency_saved += entry.latency
+            return entry.output
+
+    def put(self, key: tuple, output: str, latency: float) -> None:
+        """Store an output together with the time it took to produce it."""
+        with self._lock:
+            self._entries[key] = _Entry(output, latency, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Return size, hit ratio and the model time saved by hits."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "latency_saved_s": round(self.latency_saved, 2),
+            }
@@ -0,0 +1,235 @@
+"""Latency-aware model routing with fallback and optional hedging.
+
+The router keeps a rolling window of latencies and errors per model, orders the
+candidate models for each query and runs them through a caller-supplied
+coroutine, so it can be exercised with stub models.
+"""
+
+import asyncio
+import logging
+import re
+import statistics
+import time
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, TypeVar
+
+from config import AUTO_MODEL
+
+_LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Cheap, fast models preferred for simple lookups
+FAST_MODELS = ["o4-mini", "anthropic:claude-3-5-haiku-latest"]
+
+# Words suggesting the user wants more than a lookup
+_COMPLEX = re.compile(
+    r"\b(opsummer\w*|sammenfat\w*|summari[sz]e|explain|forklar\w*|skriv|write|"
+    r"compare|sammenlign\w*|plan\w*|why|hvorfor)\b",
+    re.IGNORECASE,
+)
+
+
+class ModelStats:
+    """Rolling latency and error statistics for a single model."""
+
+    def __init__(self, window: int = 100):
+        self._calls: deque[tuple[float, bool]] = deque(maxlen=window)
+        self.total = 0
+
+    def record(self, latency: float, ok: bool) -> None:
+        self._calls.append((latency, ok))
+        self.total += 1
+
+    @property
+    def error_rate(self) -> float:
+        if not self._calls:
+            return 0.0
+        return sum(1 for _, ok in self._calls if not ok) / len(self._calls)
+
+    def percentile(self, q: int) -> float | None:
+        """Return the q-th percentile latency of successful calls."""
+        latencies = [latency for latency, ok in self._calls if ok]
+        if not latencies:
+            return None
+        if len(latencies) == 1:
+            return latencies[0]
+        return statistics.quantiles(latencies, n=100, method="inclusive")[q - 1]
+
+
+class ModelRouter:
+    """Order models per query and run them with timeout, fallback and hedging."""
+
+    def __init__(
+        self,
+        models: list[str],
+        fast_models: list[str] | None = None,
+        timeout: float = 60,
+        hedge_after: float | None = None,
+        max_attempts: int = 3,
+    ):
+        """Create a router.
+
+        Args:
+            models: All models that may be used
+            fast_models: Models preferred for simple lookups, defaults to FAST_MODELS
+            timeout: Seconds before a model call is abandoned
+            hedge_after: If set, start the next candidate in parallel when a call
+                has not finished after this many seconds, and keep the first answer
+            max_attempts: Maximum number of models tried per query
+        """
+        self.models = list(models)
+        self.fast_models = [m for m in (fast_models or FAST_MODELS) if m in self.models]
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.max_attempts = max_attempts
+        self._stats: defaultdict[str, ModelStats] = defaultdict(ModelStats)
+        self.decisions: deque[dict] = deque(maxlen=50)
+
+    def is_simple_lookup(self, query: str, agent: str) -> bool:
+        """Guess whether a query is a short Aula lookup a fast model handles well."""
+        return (
+            agent == "aula_agent"
+            and len(query.split()) <= 20
+            and not _COMPLEX.search(query)
+        )
+
+    def score(self, model: str) -> float:
+        """Lower is better: p95 latency, penalised by the recent error rate.
+
+        Untried models score like the slowest measured model, so they are tried
+        as fallbacks without jumping ahead of models known to be fast. Models
+        that have only failed score as if every call timed out.
+        """
+        stats = self._stats[model]
+        p95 = stats.percentile(95)
+        if p95 is None:
+            if stats.total:
+                p95 = self.timeout
+            else:
+                measured = [s.percentile(95) for s in self._stats.values() if s.total]
+                p95 = max((p for p in measured if p is not None), default=self.timeout)
+        return p95 * (1 + 4 * stats.error_rate)
+
+    def _rank(self, model: str) -> tuple[float, bool]:
+        # On equal scores, measured models go before untried ones
+        return self.score(model), self._stats[model].total == 0
+
+    async def route(
+        self,
+        query: str,
+        agent: str,
+        requested: str,
+        call: Callable[[str], Awaitable[T]],
+    ) -> T:
+        """Select the candidate models for a query and run them.
+
+        Args:
+            query: The user query
+            agent: Name of the agent answering it
+            requested: Model requested by the caller, or AUTO_MODEL
+            call: Coroutine function running the query on a given model
+        """
+        candidates = self.select(query, agent, requested)
+        return await self.run(candidates, call, decision=self.decisions[-1])
+
+    def select(self, query: str, agent: str, requested: str) -> list[str]:
+        """Return the models to try for a query, best first.
+
+        An explicitly requested model always comes first, followed by fallbacks.
+        With AUTO_MODEL, simple Aula lookups prefer the fast models. The decision
+        is recorded in self.decisions.
+        """
+        ranked = sorted(self.models, key=self._rank)
+        if requested != AUTO_MODEL:
+            candidates = [requested] + [m for m in ranked if m != requested]
+            reason = "requested"
+        elif self.is_simple_lookup(query, agent) and self.fast_models:
+            fast = sorted(self.fast_models, key=self._rank)
+            candidates = fast + [m for m in ranked if m not in fast]
+            reason = "simple lookup"
+        else:
+            candidates = ranked
+            reason = "fastest"
+        candidates = candidates[: self.max_attempts]
+        self.decisions.append(
+            {"agent": agent, "reason": reason, "candidates": candidates}
+        )
+        return candidates
+
+    async def run(
+        self,
+        candidates: list[str],
+        call: Callable[[str], Awaitable[T]],
+        decision: dict | None = None,
+    ) -> T:
+        """Run call(model) for the candidates in order until one succeeds.
+
+        Args:
+            candidates: Models to try, best first
+            call: Coroutine function running the query on a given model
+            decision: Optional routing decision to annotate with the outcome
+
+        Raises:
+            The last error if every candidate fails or times out
+        """
+        pending: dict[asyncio.Task, tuple[str, float]] = {}
+        queue = list(candidates)
+        last_error: BaseException | None = None
+        winner_started: float | None = None
+        decision = {} if decision is None else decision
+
+        def start_next() -> None:
+            model = queue.pop(0)
+            task = asyncio.ensure_future(asyncio.wait_for(call(model), self.timeout))
+            pending[task] = (model, time.perf_counter())
+
+        start_next()
+        try:
+            while pending:
+                wait = self.hedge_after if self.hedge_after and queue else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    _LOGGER.info(f"Hedging with {queue[0]}")
+                    decision["hedged"] = True
+                    start_next()
+                    continue
+                for task in done:
+                    model, started = pending.pop(task)
+                    latency = time.perf_counter() - started
+                    if task.exception() is None:
+                        self._stats[model].record(latency, ok=True)
+                        decision["chosen"] = model
+                        winner_started = started
+                        return task.result()
+                    last_error = task.exception()
+                    self._stats[model].record(latency, ok=False)
+                    _LOGGER.warning(f"Model {model} failed: {last_error!r}")
+                if not pending and queue:
+                    decision.setdefault("fallbacks", 0)
+                    decision["fallbacks"] += 1
+                    start_next()
+        finally:
+            now = time.perf_counter()
+            for task, (model, started) in pending.items():
+                task.cancel()
+                if winner_started is not None and started <= winner_started:
+                    # Started before the winner and still running: it is at least
+                    # this slow, which is all the router needs to rank it lower
+                    self._stats[model].record(now - started, ok=True)
+        raise last_error
+
+    def stats(self) -> dict:
+        """Return per-model latency percentiles and error rates, and recent decisions."""
+        models = {}
+        for model, stats in self._stats.items():
+            p50, p95 = stats.percentile(50), stats.percentile(95)
+            models[model] = {
+                "calls": stats.total,
+                "error_rate": round(stats.error_rate, 3),
+                "p50_s": None if p50 is None else round(p50, 2),
+                "p95_s": None if p95 is None else round(p95, 2),
+            }
+        return {"models": models, "decisions": list(self.decisions)[-10:]}
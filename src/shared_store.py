@@ -0,0 +1,183 @@
+"""Key/value store shared by all API workers.
+
+Used to share Aula login sessions and cached API responses between uvicorn
+workers, so each family is logged in and fetched once instead of once per worker.
+Backends are picked by URL with open_store():
+
+    sqlite:///data/shared.db   SQLite in WAL mode, shared by processes on one host
+    redis://localhost:6379/0   Redis (needs the optional `redis` package)
+    memory://                  In-process only, for tests and single workers
+"""
+
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+import time
+from pathlib import Path
+
+
+class SharedStore(ABC):
+    """Interface of the shared key/value stores. Values are bytes."""
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None: ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> None: ...
+
+    @abstractmethod
+    def add(self, key: str, value: bytes, ttl: float | None = None) -> bool:
+        """Set the key only if it does not exist. Returns True if it was set."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+
+class MemoryStore(SharedStore):
+    """In-process store with the same semantics as the shared backends."""
+
+    # Seconds between purges of expired keys
+    PURGE_INTERVAL = 60
+
+    def __init__(self):
+        self._data: dict[str, tuple[bytes, float | None]] = {}
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        with self._lock:
+            self._data[key] = (value, now + ttl if ttl else None)
+            if now - self._purged_at > self.PURGE_INTERVAL:
+                expired = [
+                    k for k, (_, exp) in self._data.items() if exp and exp <= now
+                ]
+                for k in expired:
+                    del self._data[k]
+                self._purged_at = now
+
+    def add(self, key, value, ttl=None):
+        if self.get(key) is not None:
+            return False
+        with self._lock:
+            if key in self._data:
+                return False
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SQLiteStore(SharedStore):
+    """SQLite (WAL mode) store shared by all processes on the host."""
+
+    # Seconds between purges of expired rows
+    PURGE_INTERVAL = 60
+
+    def __init__(self, path: str | Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(path), timeout=10, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS kv_expires ON kv (expires)")
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv VALUES (?, ?, ?)",
+                (key, value, now + ttl if ttl else None),
+            )
+            if now - self._purged_at > self.PURGE_INTERVAL:
+                # Cached responses get new keys as content changes, so expired
+                # rows are never overwritten and must be deleted
+                self._conn.execute("DELETE FROM kv WHERE expires <= ?", (now,))
+                self._purged_at = now
+
+    def add(self, key, value, ttl=None):
+        now = time.time()
+        with self._lock:
+            # Replace the row only if it is missing or expired, atomically
+            cursor = self._conn.execute(
+                "INSERT INTO kv VALUES (?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                "value = excluded.value, expires = excluded.expires "
+                "WHERE kv.expires IS NOT NULL AND kv.expires <= ?",
+                (key, value, now + ttl if ttl else None, now),
+            )
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+
+class RedisStore(SharedStore):
+    """Store backed by any Redis-compatible client (redis-py, fakeredis, ...)."""
+
+    def __init__(self, client):
+        self._client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisStore":
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                "The redis package is required for a redis:// shared store"
+            ) from e
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        return bool(
+            self._client.set(key, value, nx=True, px=int(ttl * 1000) if ttl else None)
+        )
+
+    def delete(self, key):
+        self._client.delete(key)
+
+
+def open_store(url: str) -> SharedStore:
+    """Open a shared store from a URL (sqlite:///path, redis://..., memory://)."""
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url.removeprefix("sqlite:///"))
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore.from_url(url)
+    if url.startswith("memory://"):
+        return MemoryStore()
+    raise ValueError(f"Unsupported shared store URL: {url}")
@@ -0,0 +1,50 @@
+import threading
+import time
+import unittest
+
+from src.aula_client import AulaClient
+from src.shared_store import MemoryStore
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class _ExpiredSession:
+    """Answer every session check as if the login had expired."""
+
+    def request(self, method, url, **kwargs):
+        time.sleep(0.05)
+        return _Response({"status": {"message": "Unauthorized"}})
+
+
+class EnsureSessionTest(unittest.TestCase):
+    def test_concurrent_threads_log_in_once(self):
+        client = AulaClient("test", "test", store=MemoryStore())
+        client._session = _ExpiredSession()
+        logins = []
+
+        def login():
+            logins.append(threading.get_ident())
+            time.sleep(0.05)
+            client._session = object()
+            client._checked_at = time.monotonic()
+            return True
+
+        client._login = login
+        threads = [threading.Thread(target=client.ensure_session) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(logins), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import time
+import unittest
+from unittest import mock
+
+from src.aula_client import AulaClient
+from src.message_index import MessageIndex
+from src.shared_store import MemoryStore
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class _StubSession:
+    """Serve one Aula thread whose messages can change between requests."""
+
+    def __init__(self):
+        self.messages = [_message(1, "Husk skovtur på fredag")]
+
+    def request(self, method, url, **kwargs):
+        if "getThreads" in url:
+            threads = []
+            if "page=0" in url:
+                latest = self.messages[-1]
+                threads = [{"id": 7, "subject": "Skovtur", "latestMessage": latest}]
+            return _Response(
+                {"status": {"message": "OK"}, "data": {"threads": threads}}
+            )
+        data = {"messages": list(self.messages)}
+        return _Response({"status": {"code": 0, "message": "OK"}, "data": data})
+
+
+def _message(message_id: int, text: str) -> dict:
+    return {
+        "id": message_id,
+        "messageType": "Message",
+        "text": {"html": f"<p>{text}</p>"},
+        "sender": {"fullName": "Lærer Larsen"},
+        "sendDateTime": f"2025-03-1{message_id}T08:00:00+00:00",
+    }
+
+
+class MessageIndexSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.session = _StubSession()
+        self.client = AulaClient("test", "test", store=MemoryStore())
+        self.client._session = self.session
+        self.client.ensure_session = lambda: None
+        self.index = MessageIndex()
+
+    def test_new_message_is_searchable_after_sync(self):
+        self.index.sync(self.client)
+        self.assertEqual(len(self.index.search("skovtur")), 1)
+
+        self.session.messages.append(_message(2, "Husk madpakke og regntøj"))
+        # The cached thread list (60 s) has expired, a cached body (300 s) not
+        later = time.time() + 120
+        with mock.patch("src.shared_store.time.time", return_value=later):
+            self.index.sync(self.client)
+
+        results = self.index.search("madpakke")
+        self.assertEqual(len(results), 1)
+        self.assertIn("madpakke", results[0]["snippet"])
+
+    def test_unchanged_thread_is_not_refetched(self):
+        self.index.sync(self.client)
+        self.session.messages.append(_message(2, "Husk madpakke"))
+        # Thread list still cached, so the thread looks unchanged
+        self.assertEqual(self.index.sync(self.client), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+
+from config import AUTO_MODEL
+from src.routing import ModelRouter
+
+
+def _stub_models(delays: dict[str, float], failing: set[str] = frozenset()):
+    """Return a call(model) coroutine function for models with fixed latencies."""
+    calls = []
+
+    async def call(model: str) -> str:
+        calls.append(model)
+        await asyncio.sleep(delays.get(model, 0))
+        if model in failing:
+            raise RuntimeError(f"{model} is down")
+        return model
+
+    return call, calls
+
+
+class ModelRouterTest(unittest.TestCase):
+    def route(self, router: ModelRouter, call, requested: str = AUTO_MODEL) -> str:
+        query = "Write a summary of this week's research"
+        return asyncio.run(router.route(query, "research_agent", requested, call))
+
+    def test_hedge_records_the_slow_model_and_ranks_it_last(self):
+        router = ModelRouter(["slow", "fast"], fast_models=[], hedge_after=0.05)
+        call, calls = _stub_models({"slow": 1.0, "fast": 0.01})
+
+        self.assertEqual(self.route(router, call), "fast")
+        self.assertEqual(calls, ["slow", "fast"])
+        self.assertTrue(router.decisions[-1]["hedged"])
+        stats = router.stats()["models"]
+        self.assertEqual(stats["slow"]["calls"], 1)
+        self.assertGreater(stats["slow"]["p95_s"], stats["fast"]["p95_s"])
+
+        # The next query goes straight to the fast model, without hedging
+        calls.clear()
+        self.assertEqual(self.route(router, call), "fast")
+        self.assertEqual(calls, ["fast"])
+        self.assertEqual(router.decisions[-1]["candidates"], ["fast", "slow"])
+
+    def test_fallback_to_next_model_and_rank_failing_model_last(self):
+        router = ModelRouter(["broken", "ok", "spare"], fast_models=[])
+        call, calls = _stub_models({}, failing={"broken"})
+
+        self.assertEqual(self.route(router, call), "ok")
+        self.assertEqual(calls, ["broken", "ok"])
+        self.assertEqual(router.decisions[-1]["fallbacks"], 1)
+        self.assertEqual(
+            router.select("query", "research_agent", AUTO_MODEL)[-1], "broken"
+        )
+
+    def test_untried_models_do_not_outrank_measured_ones(self):
+        router = ModelRouter(["new", "known"], fast_models=[])
+        call, _ = _stub_models({"known": 0.01})
+        self.route(router, call, requested="known")
+        self.assertEqual(
+            router.select("query", "research_agent", AUTO_MODEL)[0], "known"
+        )
+
+    def test_requested_model_comes_first(self):
+        router = ModelRouter(["a", "b"], fast_models=[])
+        call, calls = _stub_models({})
+        self.assertEqual(self.route(router, call, requested="b"), "b")
+        self.assertEqual(calls, ["b"])
+
+
+if __name__ == "__main__":
+    unittest.main()